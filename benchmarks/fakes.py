@@ -0,0 +1,455 @@
+"""In-memory stand-ins for maya.cmds, OpenMaya, avalon and colorbleed
+
+The fakes only implement what the Yeti Rig Manager library uses, backed
+by a synthetic `Scene`. Call `install()` before importing the library.
+
+"""
+import os
+import sys
+import json
+import types
+import random
+import functools
+from collections import Counter
+
+# Calls made to the fake OpenMaya classes, see `count_api_calls`
+api_calls = Counter()
+
+
+class Scene(object):
+    """A synthetic scene with containers, nodes and connections
+
+    Args:
+        containers (int): amount of non-rig containers
+        nodes (int): amount of nodes per container
+        rigs (int): amount of Yeti rig containers
+        inputs (int): amount of inputs per rig
+        root (str): directory to write the .rigsettings files to
+        seed (int): seed for the random choices
+
+    """
+
+    def __init__(self, containers, nodes, rigs, inputs, root, seed=0):
+        rand = random.Random(seed)
+
+        self.ids = {}
+        self.long_names = {}
+        self.sets = {}
+        self.connections = {}
+        self.containers = []
+        self.representations = {}
+
+        # All containers are instances of the same asset, so each of them
+        # is a candidate for every rig
+        for index in range(containers):
+            namespace = "asset_%04d_" % index
+            members = []
+            for node_index in range(nodes):
+                name = "%s:node_%04d" % (namespace, node_index)
+                long_name = "|%s:grp|%s" % (namespace, name)
+                self.ids[long_name] = "asset:%04d" % node_index
+                self.long_names[name] = long_name
+                members.append(long_name)
+
+            self._add_container(namespace, "Asset", "ReferenceLoader",
+                                members, None)
+
+        for index in range(rigs):
+            namespace = "rig_%04d_" % index
+            members = []
+            rig_inputs = []
+            for input_index in range(inputs):
+                name = "%s:yeti_%04dShape" % (namespace, input_index)
+                long_name = "|%s:grp|%s" % (namespace, name)
+                self.ids[long_name] = "rig:%04d" % input_index
+                self.long_names[name] = long_name
+                members.append(long_name)
+
+                source = rand.randrange(nodes) if nodes else 0
+                rig_inputs.append({"connections": ["worldMesh", "inMesh"],
+                                   "sourceID": "asset:%04d" % source,
+                                   "destinationID": "rig:%04d" % input_index})
+
+            path = os.path.join(root, "%s.abc" % namespace)
+            with open(os.path.splitext(path)[0] + ".rigsettings", "w") as f:
+                json.dump({"inputs": rig_inputs}, f)
+
+            self._add_container(namespace, "Rig", "YetiRigLoader",
+                                members, path)
+
+    def _add_container(self, namespace, name, loader, members, path):
+        object_name = "%s%s_CON" % (namespace, name)
+        representation = "%024x" % len(self.representations)
+
+        self.sets[object_name] = members
+        self.representations[representation] = {
+            "_id": representation,
+            "data": {"path": path or "%s.ma" % object_name}}
+
+        self.containers.append({"objectName": object_name,
+                                "namespace": namespace,
+                                "name": name,
+                                "loader": loader,
+                                "representation": representation})
+
+    def long_name(self, node):
+        if node.startswith("|"):
+            return node
+        return self.long_names.get(node, node)
+
+    def short_name(self, node):
+        return node.rsplit("|", 1)[-1]
+
+
+def _split_plug(plug):
+    node, attr = plug.split(".", 1)
+    return node, attr
+
+
+# The scene used by all fake modules, set by `install`
+_current = {"scene": None}
+
+
+class FakeCmds(types.ModuleType):
+
+    def __init__(self):
+        types.ModuleType.__init__(self, "maya.cmds")
+
+    @property
+    def scene(self):
+        return _current["scene"]
+
+    def _plug(self, plug):
+        node, attr = _split_plug(plug)
+        node = self.scene.long_name(node)
+        if node not in self.scene.ids:
+            raise ValueError("No object matches name: %s" % plug)
+        return "%s.%s" % (node, attr.split("[", 1)[0])
+
+    def file(self, *args, **kwargs):
+        return "/tmp/benchmark.ma"
+
+    def undoInfo(self, **kwargs):
+        return None
+
+    def sets(self, name, query=False, nodesOnly=False):
+        return list(self.scene.sets.get(name, [])) or None
+
+    def ls(self, nodes=None, long=False, showType=False, recursive=False):
+        if nodes is None:
+            return list(self.scene.ids)
+        if nodes == "*.cbId":
+            # All nodes of the scene have a cbId
+            return ["%s.cbId" % (node if long else self.scene.short_name(node))
+                    for node in self.scene.ids]
+        if not isinstance(nodes, (list, tuple)):
+            nodes = [nodes]
+
+        result = []
+        for node in nodes:
+            # All attributes exist on all nodes
+            node, dot, attr = node.partition(".")
+            long_name = self.scene.long_name(node)
+            if long_name not in self.scene.ids:
+                continue
+
+            name = long_name if long else self.scene.short_name(long_name)
+            result.append(name + dot + attr)
+            if showType:
+                result.append("pgYetiMaya" if "yeti" in name else "mesh")
+        return result
+
+    def listConnections(self, objects, **kwargs):
+        if not isinstance(objects, (list, tuple)):
+            objects = [objects]
+
+        result = []
+        for plug in objects:
+            plug = self._plug(plug)
+            src = self.scene.connections.get(plug)
+            if src is None:
+                continue
+            result.append(self.scene.short_name(plug))
+            result.append(self.scene.short_name(src) + "[0]")
+        return result
+
+    def isConnected(self, source, destination):
+        source = self._plug(source)
+        return self.scene.connections.get(self._plug(destination)) == source
+
+    def connectAttr(self, source, destination, force=False):
+        destination = self._plug(destination)
+        if destination in self.scene.connections and not force:
+            raise RuntimeError("Destination already connected")
+        self.scene.connections[destination] = self._plug(source)
+
+    def disconnectAttr(self, source, destination):
+        self.scene.connections.pop(self._plug(destination), None)
+
+    def pluginInfo(self, path, query=False, loaded=False):
+        return True
+
+    def yetiRigManagerApply(self):
+        # Command of the undo plug-in
+        from mayayetirigmanager import apiundo
+        apiundo.take().doIt()
+
+
+class _MPlugRef(object):
+    """Plug of a connection, identified by its normalized name"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __eq__(self, other):
+        return isinstance(other, _MPlugRef) and self.name == other.name
+
+    def __ne__(self, other):
+        return not self == other
+
+    def attribute(self):
+        return _MAttribute()
+
+    def asString(self):
+        node, attr = _split_plug(self.name)
+        return _current["scene"].ids[node] if attr == "cbId" else ""
+
+    def connectedTo(self, asDst, asSrc):
+        source = _current["scene"].connections.get(self.name)
+        return [_MPlugRef(source)] if asDst and source else []
+
+
+class _MAttribute(object):
+    """All attributes are mesh attributes"""
+
+    apiTypeStr = "kTypedAttribute"
+
+    def hasFn(self, fn):
+        return fn == 3
+
+
+class _MFnTypedAttribute(object):
+    def __init__(self, attribute):
+        pass
+
+    def attrType(self):
+        return 13
+
+
+class _MFnData(object):
+    kAny = 24
+    kMesh = 13
+
+
+class _MSelectionList(object):
+    def __init__(self):
+        self._items = []
+        self._added = set()
+
+    def add(self, name):
+        cmds = sys.modules["maya.cmds"]
+        if "." not in name:
+            name = cmds.scene.long_name(name)
+            if name not in cmds.scene.ids:
+                raise RuntimeError("(kInvalidParameter): Object does not "
+                                   "exist")
+        else:
+            try:
+                name = cmds._plug(name)
+            except ValueError:
+                raise RuntimeError("(kInvalidParameter): Object does not "
+                                   "exist")
+
+        # Items which are already in the list are merged
+        if name not in self._added:
+            self._added.add(name)
+            self._items.append(name)
+
+    def length(self):
+        return len(self._items)
+
+    def clear(self):
+        self._items = []
+        self._added = set()
+
+    def getPlug(self, index):
+        return _MPlugRef(self._items[index])
+
+    def getDagPath(self, index):
+        return _MDagPath(self._items[index])
+
+
+class _MDagPath(object):
+    """All nodes of the scene are DAG nodes"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def fullPathName(self):
+        return self.name
+
+
+class _MDGModifier(object):
+    def __init__(self):
+        self._operations = []
+
+    def connect(self, source, destination):
+        self._operations.append((True, source.name, destination.name))
+
+    def disconnect(self, source, destination):
+        self._operations.append((False, source.name, destination.name))
+
+    def doIt(self):
+        connections = _current["scene"].connections
+        for connect, source, destination in self._operations:
+            if connect:
+                connections[destination] = source
+            else:
+                connections.pop(destination, None)
+
+
+def _counted(func, name):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        api_calls[name] += 1
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def count_api_calls(cls, name):
+    """Count the construction and method calls of the fake class
+
+    Args:
+        cls (type): fake OpenMaya class
+        name (str): name of the class in OpenMaya, e.g. "MSelectionList"
+
+    Returns:
+        type: the class
+
+    """
+
+    for attr, value in list(vars(cls).items()):
+        if not callable(value) or (attr.startswith("_") and
+                                   attr != "__init__"):
+            continue
+
+        key = "om.%s" % name
+        if attr != "__init__":
+            key += ".%s" % attr
+        setattr(cls, attr, _counted(value, key))
+
+    return cls
+
+
+def _create_openmaya():
+    om = types.ModuleType("maya.api.OpenMaya")
+
+    class MFn(object):
+        kDagNode = 1
+        kSet = 2
+        kTypedAttribute = 3
+        kGenericAttribute = 4
+        kNumericAttribute = 5
+        kUnitAttribute = 6
+        kEnumAttribute = 7
+        kMessageAttribute = 8
+        kMatrixAttribute = 9
+        kCompoundAttribute = 10
+
+    om.MFn = MFn
+    om.MSelectionList = count_api_calls(_MSelectionList, "MSelectionList")
+    om.MDGModifier = count_api_calls(_MDGModifier, "MDGModifier")
+    om.MFnData = _MFnData
+    om.MFnTypedAttribute = count_api_calls(_MFnTypedAttribute,
+                                           "MFnTypedAttribute")
+
+    # Plugs and attributes are returned by the other classes
+    count_api_calls(_MPlugRef, "MPlug")
+    count_api_calls(_MDagPath, "MDagPath")
+    count_api_calls(_MAttribute, "MObject")
+
+    return om
+
+
+class _Host(object):
+
+    def ls(self):
+        for container in _current["scene"].containers:
+            yield dict(container)
+
+
+def _find(query):
+    representations = _current["scene"].representations
+    return [representations[_id] for _id in query["_id"]["$in"]
+            if _id in representations]
+
+
+def _find_one(query):
+    return _current["scene"].representations.get(query["_id"])
+
+
+def _get_id(node):
+    scene = _current["scene"]
+    return scene.ids.get(scene.long_name(node))
+
+
+def install(scene):
+    """Install the fake modules in `sys.modules` and set the scene
+
+    The modules are only created once, installing another scene switches
+    the scene of the modules which were already imported.
+
+    Args:
+        scene (Scene): the synthetic scene
+
+    Returns:
+        None
+
+    """
+
+    _current["scene"] = scene
+
+    if isinstance(sys.modules.get("maya.cmds"), FakeCmds):
+        return
+
+    cmds = FakeCmds()
+    om = _create_openmaya()
+
+    maya = types.ModuleType("maya")
+    maya_api = types.ModuleType("maya.api")
+    maya.cmds = cmds
+    maya.api = maya_api
+    maya_api.OpenMaya = om
+
+    io = types.ModuleType("avalon.io")
+    io.ObjectId = str
+    io.find = _find
+    io.find_one = _find_one
+
+    host = _Host()
+    api = types.ModuleType("avalon.api")
+    api.registered_host = lambda: host
+    api.get_representation_path = lambda doc: doc["data"]["path"]
+
+    avalon = types.ModuleType("avalon")
+    avalon.io = io
+    avalon.api = api
+
+    cb = types.ModuleType("colorbleed.maya.lib")
+    cb.get_id = _get_id
+
+    colorbleed = types.ModuleType("colorbleed")
+    colorbleed_maya = types.ModuleType("colorbleed.maya")
+    colorbleed.maya = colorbleed_maya
+    colorbleed_maya.lib = cb
+
+    sys.modules.update({"maya": maya,
+                        "maya.cmds": cmds,
+                        "maya.api": maya_api,
+                        "maya.api.OpenMaya": om,
+                        "avalon": avalon,
+                        "avalon.io": io,
+                        "avalon.api": api,
+                        "colorbleed": colorbleed,
+                        "colorbleed.maya": colorbleed_maya,
+                        "colorbleed.maya.lib": cb})
@@ -0,0 +1,308 @@
+"""Time the hot paths of the library on synthetic scenes
+
+Runs with plain CPython, Maya, Avalon and Colorbleed are replaced by the
+in-memory fakes of `fakes.py`. The fakes are a lot cheaper than the real
+commands, so next to the wall time the amount of calls to `maya.cmds`,
+the database and the Colorbleed library, and the amount of calls to
+OpenMaya are reported per step.
+
+The results can be saved as a baseline, a later run compared to it exits
+with an error when a step makes more calls or is slower than the
+tolerance allows.
+
+Example:
+    python benchmarks/run.py
+    python benchmarks/run.py --scale 10x100x5 --scale 100x1000x40
+    python benchmarks/run.py --scale 10x100x5 --save-baseline base.json
+    python benchmarks/run.py --scale 10x100x5 --baseline base.json
+
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import timeit
+
+import fakes
+
+# Containers x nodes per container x rigs
+DEFAULT_SCALES = ["10x100x2", "50x200x10", "100x500x20", "200x1000x40"]
+
+# Amount of inputs per rig
+INPUTS = 10
+
+# Seconds each file read takes on simulated network storage
+LATENCY = 0.02
+
+# Fraction a step can be slower than its baseline
+TOLERANCE = 0.5
+
+# Steps faster than this amount of seconds are not compared on time
+MIN_DURATION = 0.005
+
+
+def _import_lib():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+
+    from mayayetirigmanager import lib
+    return lib
+
+
+def count_calls(func):
+    """Get the amount of calls made by the library while running func
+
+    Returns:
+        tuple: calls to maya.cmds, the database and the Colorbleed library,
+            and calls to OpenMaya
+
+    """
+    from mayayetirigmanager import profiling
+
+    fakes.api_calls.clear()
+    profiling.enable()
+    try:
+        profile = profiling.begin("benchmark")
+        func()
+        profiling.end(profile)
+    finally:
+        profiling.disable()
+        profiling.clear_history()
+
+    return sum(profile.calls.values()), sum(fakes.api_calls.values())
+
+
+def measure(func, repeat):
+    """Get the best wall time of the function in seconds"""
+    best = None
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        func()
+        duration = timeit.default_timer() - start
+        best = duration if best is None else min(best, duration)
+    return best
+
+
+def benchmark(name, func, repeat):
+    calls, api_calls = count_calls(func)
+    return name, measure(func, repeat), calls, api_calls
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Get the steps which regressed compared to the baseline
+
+    The amount of calls is exact, so any increase is a regression. Timings
+    are noisy and only regress when they exceed the tolerance.
+
+    Args:
+        results (dict): timings per scale, as saved by `main`
+        baseline (dict): earlier results
+        tolerance (float): fraction a step can be slower
+
+    Returns:
+        list: messages of the regressions
+
+    """
+
+    regressions = []
+    for scale, steps in sorted(results.items()):
+        for name, result in sorted(steps.items()):
+            base = baseline.get(scale, {}).get(name)
+            if base is None:
+                continue
+
+            for key in ("calls", "api_calls"):
+                if result[key] > base[key]:
+                    regressions.append("%s %s: %i %s, was %i"
+                                       % (scale, name, result[key],
+                                          key.replace("_", " "), base[key]))
+
+            limit = max(base["duration"], MIN_DURATION) * (1 + tolerance)
+            if result["duration"] > limit:
+                regressions.append("%s %s: %.2f ms, was %.2f ms"
+                                   % (scale, name,
+                                      result["duration"] * 1000,
+                                      base["duration"] * 1000))
+
+    return regressions
+
+
+def split(nodes):
+    rigs = [n for n in nodes if n["loader"] == "YetiRigLoader"]
+    others = [n for n in nodes if n["loader"] != "YetiRigLoader"]
+    return rigs, others
+
+
+def run_scale(lib, scale, root, repeat):
+    containers, nodes, rigs = [int(value) for value in scale.split("x")]
+
+    scene = fakes.Scene(containers, nodes, rigs, INPUTS, root)
+    fakes.install(scene)
+    lib.clear_cache()
+
+    def collect(**kwargs):
+        return [lib.create_node(c) for c in lib.get_containers(**kwargs)]
+
+    timings = []
+
+    timings.append(benchmark("get_containers (per node)",
+                             lambda: collect(use_index=False), repeat))
+    timings.append(benchmark("get_containers (index)", collect, repeat))
+
+    # The lazy mode resolves on access, include the matching in the timing
+    def lazy():
+        rig_items, other_items = split(collect(lazy=True))
+        lib.get_matches(rig_items, other_items)
+
+    timings.append(benchmark("get_containers (lazy) + get_matches",
+                             lazy, repeat))
+
+    rig_items, other_items = split(collect())
+
+    representations = [node["representation"] for node in rig_items]
+
+    def fetch_cold():
+        lib.clear_cache()
+        lib.get_connections_bulk(representations)
+
+    os.environ[lib.diskcache.ENVIRONMENT_VARIABLE] = "0"
+    timings.append(benchmark("get_connections_bulk (cold)",
+                             fetch_cold, repeat))
+
+    # Reads from network storage overlap in the thread pool
+    load = lib.sidecar.load
+
+    def slow_load(*args, **kwargs):
+        time.sleep(LATENCY)
+        return load(*args, **kwargs)
+
+    lib.sidecar.load = slow_load
+    try:
+        timings.append(benchmark("get_connections_bulk (cold, %i ms reads)"
+                                 % (LATENCY * 1000), fetch_cold, 1))
+    finally:
+        lib.sidecar.load = load
+
+    # Fill the persistent cache, then only read from it
+    os.environ[lib.diskcache.ENVIRONMENT_VARIABLE] = os.path.join(root,
+                                                                  "cache")
+    fetch_cold()
+    timings.append(benchmark("get_connections_bulk (disk cache)",
+                             fetch_cold, repeat))
+
+    matches = lib.get_matches(rig_items, other_items)
+    timings.append(benchmark("get_matches",
+                             lambda: lib.get_matches(rig_items, other_items),
+                             repeat))
+
+    plan = lib.get_assignment(rig_items, matches)
+    pairs = [(entry["rig"], entry["match"]) for entry in plan]
+    timings.append(benchmark("get_assignment",
+                             lambda: lib.get_assignment(rig_items, matches),
+                             repeat))
+
+    candidates = [(rig, match) for match in matches for rig in rig_items
+                  if rig["objectName"] in match["rigs"]]
+    timings.append(benchmark("validate (all candidates)",
+                             lambda: lib.validate(candidates), repeat))
+
+    # Connecting twice only connects once, disconnect in between
+    def connect():
+        lib.connect_many(pairs)
+        lib.disconnect_many(pairs)
+
+    timings.append(benchmark("connect_many + disconnect_many",
+                             connect, repeat))
+
+    def connect_commands():
+        lib.connect_many(pairs, use_modifier=False)
+        lib.disconnect_many(pairs, use_modifier=False)
+
+    timings.append(benchmark("connect_many + disconnect_many (cmds)",
+                             connect_commands, repeat))
+
+    lib.connect_many(pairs)
+    timings.append(benchmark("get_connected_matches",
+                             lambda: lib.get_connected_matches(rig_items,
+                                                               matches),
+                             repeat))
+
+    # Applying the diff on a connected scene should not change anything
+    def reapply():
+        lib.apply_connection_diff(lib.get_connection_diff(pairs))
+
+    timings.append(benchmark("get_connection_diff + apply (connected)",
+                             reapply, repeat))
+
+    return timings
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--scale", action="append", default=None,
+                        help="Containers x nodes x rigs, e.g. 100x500x20")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Amount of runs, the best time is reported")
+    parser.add_argument("--baseline", default=None,
+                        help="Exit with an error when a step regressed "
+                             "compared to the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="Fraction a step can be slower than its "
+                             "baseline, defaults to %s" % TOLERANCE)
+    parser.add_argument("--save-baseline", default=None,
+                        help="Write the results to this JSON file")
+    args = parser.parse_args(args)
+
+    # Never use the persistent cache of the user
+    os.environ["YETI_RIG_MANAGER_CACHE"] = "0"
+
+    # The library can only be imported once the fakes are installed
+    fakes.install(None)
+    lib = _import_lib()
+
+    # Silence the per connection messages of connect and disconnect
+    lib.log.disabled = True
+
+    results = {}
+    for scale in args.scale or DEFAULT_SCALES:
+        root = tempfile.mkdtemp(prefix="yetirigmanager_")
+        try:
+            timings = run_scale(lib, scale, root, args.repeat)
+        finally:
+            shutil.rmtree(root)
+
+        print("%s (containers x nodes x rigs)" % scale)
+        for name, duration, calls, api_calls in timings:
+            print("    %-40s %10.2f ms %10i calls %10i api calls"
+                  % (name, duration * 1000, calls, api_calls))
+        print("")
+
+        results[scale] = dict((name, {"duration": duration,
+                                      "calls": calls,
+                                      "api_calls": api_calls})
+                              for name, duration, calls, api_calls
+                              in timings)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline, args.tolerance)
+        for message in regressions:
+            print("Regression: %s" % message)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
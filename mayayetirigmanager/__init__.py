@@ -1,4 +1,12 @@
-from .app import show
+def show(parent=None):
+    """Display the Yeti Rig Manager GUI
+
+    The application is imported on demand so the batch tools can be used
+    without loading any of the interface modules.
+
+    """
+    from .app import show
+    return show(parent=parent)
 
 
 __all__ = [
@@ -0,0 +1,73 @@
+"""Undo support for changes made with OpenMaya modifiers
+
+Changes made with `MDGModifier.doIt()` are not in the undo queue of Maya.
+The modifier is passed on to a command of a small plug-in instead, which
+executes it and undoes or redoes it with the rest of the undo queue.
+
+Example:
+    modifier = om.MDGModifier()
+    modifier.connect(source, destination)
+    apiundo.commit(modifier)
+
+"""
+import os
+import logging
+
+from maya import cmds
+
+log = logging.getLogger(__name__)
+
+PLUGIN = os.path.join(os.path.dirname(__file__),
+                      "plugins",
+                      "yetiRigManagerUndo.py")
+
+COMMAND = "yetiRigManagerApply"
+
+_state = {"available": None}
+
+# Modifier handed over to the command of the plug-in
+_pending = []
+
+
+def is_available():
+    """Load the plug-in, returns False when it could not be loaded"""
+
+    if _state["available"] is None:
+        try:
+            if not cmds.pluginInfo(PLUGIN, query=True, loaded=True):
+                cmds.loadPlugin(PLUGIN, quiet=True)
+            _state["available"] = True
+        except Exception as exc:
+            log.warning("Could not load the undo plug-in: %s" % exc)
+            _state["available"] = False
+
+    return _state["available"]
+
+
+def commit(modifier):
+    """Execute the modifier as a single undoable command
+
+    Args:
+        modifier(om.MDGModifier): modifier with the queued changes
+
+    Raises:
+        RuntimeError: the plug-in is not loaded
+
+    Returns:
+        None
+
+    """
+
+    if not is_available():
+        raise RuntimeError("The undo plug-in is not loaded: %s" % PLUGIN)
+
+    _pending.append(modifier)
+    try:
+        getattr(cmds, COMMAND)()
+    finally:
+        del _pending[:]
+
+
+def take():
+    """Get the modifier passed to `commit`, used by the plug-in"""
+    return _pending.pop()
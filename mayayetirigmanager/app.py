@@ -1,5 +1,8 @@
 import logging
 import sys
+import time
+import contextlib
+from collections import OrderedDict
 
 from avalon import style
 from avalon.tools import lib as toolslib
@@ -7,12 +10,21 @@ from avalon.tools import lib as toolslib
 from avalon.vendor import qtawesome as qta
 from avalon.vendor.Qt import QtWidgets, QtCore, QtGui
 
-from . import lib
+from . import lib, profiling
+from .callbacks import SceneWatcher, SelectionWatcher
+from .tasks import MetadataThread, ChunkedTask
 from .widgets import AssetOutliner, MatchOutliner
 
 module = sys.modules[__name__]
 module.window = None
 
+# Background threads are kept alive until they finish, even when the window
+# which started them was closed
+module.threads = []
+
+# Minimum amount of seconds between showing the rigs found by a refresh
+FLUSH_INTERVAL = 0.5
+
 
 class Window(QtWidgets.QWidget):
     UserRole = QtCore.Qt.UserRole
@@ -28,6 +40,8 @@ class Window(QtWidgets.QWidget):
 
         self.log = logging.getLogger("Yeti Rig Manager")
 
+        profiling.enable_from_environment()
+
         self.setObjectName("yetiRigManager")
         self.setWindowTitle(title)
         self.setWindowFlags(QtCore.Qt.Window)
@@ -48,8 +62,20 @@ class Window(QtWidgets.QWidget):
         refresh_button.setFixedWidth(28)
         refresh_button.setFixedHeight(28)
 
+        # Busy indicator for the refresh running in the background
+        busy_bar = QtWidgets.QProgressBar()
+        busy_bar.setRange(0, 0)
+        busy_bar.setFixedWidth(120)
+        busy_bar.setTextVisible(False)
+        busy_bar.hide()
+
+        cancel_button = QtWidgets.QPushButton("Cancel")
+        cancel_button.hide()
+
         control_layout.addWidget(force_checkbox)
         control_layout.addStretch(True)
+        control_layout.addWidget(busy_bar)
+        control_layout.addWidget(cancel_button)
         control_layout.addWidget(refresh_button)
 
         view_layout = QtWidgets.QHBoxLayout()
@@ -63,25 +89,74 @@ class Window(QtWidgets.QWidget):
         # Default action buttons
         action_button_layout = QtWidgets.QHBoxLayout()
         connect_button = QtWidgets.QPushButton("Connect")
+        connect_all_button = QtWidgets.QPushButton("Connect All Matched")
+        auto_assign_button = QtWidgets.QPushButton("Auto Assign")
         disconnect_button = QtWidgets.QPushButton("Disconnect")
+        validate_button = QtWidgets.QPushButton("Validate")
 
         action_button_layout.addWidget(connect_button)
+        action_button_layout.addWidget(connect_all_button)
+        action_button_layout.addWidget(auto_assign_button)
         action_button_layout.addWidget(disconnect_button)
+        action_button_layout.addWidget(validate_button)
+
+        # Timings of the last operation, only shown when profiling
+        status_label = QtWidgets.QLabel()
+        status_label.setVisible(profiling.is_enabled())
 
         layout.addLayout(control_layout)
         layout.addLayout(view_layout)
         layout.addLayout(action_button_layout)
+        layout.addWidget(status_label)
 
         self.setLayout(layout)
 
         self.force_checkbox = force_checkbox
         self.refresh_button = refresh_button
+        self.busy_bar = busy_bar
+        self.cancel_button = cancel_button
         self.connect_button = connect_button
+        self.connect_all_button = connect_all_button
+        self.auto_assign_button = auto_assign_button
         self.disconnect_button = disconnect_button
+        self.validate_button = validate_button
+        self.status_label = status_label
 
         self.rig_view = rig_view
         self.match_view = match_view
 
+        # Simplified nodes of all containers by object name
+        self._nodes = OrderedDict()
+        self._required_ids = set()
+
+        # Metadata per representation ID of the rigs, fetched by the refresh
+        self._metadata = {}
+        self._metadata_errors = set()
+        self._watcher = SceneWatcher(parent=self)
+
+        # Selection sync with Maya, the containers per member node are
+        # collected on the first selection change in Maya
+        self._selection_watcher = SelectionWatcher(parent=self)
+        self._container_index = None
+        self._syncing_selection = False
+        self._synced_nodes = None
+
+        # Push the selection of the views to Maya once it settles
+        select_timer = QtCore.QTimer(self)
+        select_timer.setSingleShot(True)
+        select_timer.setInterval(100)
+        self._select_timer = select_timer
+
+        # Running refresh, a new refresh supersedes the current one
+        self._metadata_thread = None
+        self._refresh_containers = []
+        self._task = None
+        self._pending = []
+        self._last_flush = 0.0
+
+        # Recorded timings of the running operation, when profiling
+        self._profile = None
+
         self.resize(*geometry)
 
         self.connections()
@@ -89,84 +164,744 @@ class Window(QtWidgets.QWidget):
     def connections(self):
 
         self.rig_view.selection_changed.connect(self.on_rig_selection_changed)
+        self.match_view.selection_changed.connect(
+            self.on_match_selection_changed)
 
-        self.refresh_button.clicked.connect(self.refresh)
+        self.refresh_button.clicked.connect(self.force_refresh)
+        self.cancel_button.clicked.connect(self.cancel_refresh)
         self.connect_button.clicked.connect(self.connect_container_nodes)
+        self.connect_all_button.clicked.connect(self.connect_all_matched)
+        self.auto_assign_button.clicked.connect(self.auto_assign)
         self.disconnect_button.clicked.connect(self.disconnect_container_nodes)
+        self.validate_button.clicked.connect(self.validate)
+
+        self._watcher.changed.connect(self.update_containers)
+        self._selection_watcher.changed.connect(
+            self.on_maya_selection_changed)
+        self._select_timer.timeout.connect(self.select_in_maya)
+        self.rig_view.selection_changed.connect(
+            self._on_view_selection_changed)
+        self.match_view.selection_changed.connect(
+            self._on_view_selection_changed)
+        self._watcher.reset.connect(self.refresh)
+
+    def showEvent(self, event):
+        self._watcher.register()
+        self._selection_watcher.register()
+        super(Window, self).showEvent(event)
+
+    def closeEvent(self, event):
+        self.cancel_refresh()
+        self._watcher.unregister()
+        self._selection_watcher.unregister()
+        self._select_timer.stop()
+        super(Window, self).closeEvent(event)
+
+    @contextlib.contextmanager
+    def _keep_maya_selection(self):
+        """Do not push selection changes of the views to Maya
+
+        Used for the changes which are not made by the user, e.g. rows which
+        are deselected because they are removed.
+
+        """
+        syncing, self._syncing_selection = self._syncing_selection, True
+        try:
+            yield
+        finally:
+            self._syncing_selection = syncing
+
+    def _on_view_selection_changed(self):
+        if not self._syncing_selection:
+            self._select_timer.start()
+
+    def select_in_maya(self):
+        """Select the members of the selected rigs and matches in Maya"""
+
+        items = (self.rig_view.get_selected_items() +
+                 self.match_view.get_selected_items())
+
+        lib.select_containers([item["objectName"] for item in items])
+
+        # The resulting selection change in Maya does not need to be synced
+        self._synced_nodes = set(lib.get_selected_nodes())
+
+    def on_maya_selection_changed(self):
+        """Select the rows of the containers of the nodes selected in Maya"""
+
+        if self.is_refreshing():
+            return
 
-    def on_rig_selection_changed(self):
-        selection_model = self.rig_view.get_selection_model()
-        indices = selection_model.selectedIndexes()
-        if len(indices) != 1:
+        nodes = lib.get_selected_nodes()
+
+        synced_nodes, self._synced_nodes = self._synced_nodes, None
+        if synced_nodes is not None and synced_nodes == set(nodes):
             return
-        index = indices[0]
 
-        self.match_view.model.set_linked_index(index)
+        if self._container_index is None:
+            self._container_index = lib.create_container_index(
+                list(self._nodes))
+
+        containers = lib.get_node_containers(nodes, self._container_index)
 
-        # The font will only update the widget gets focus
-        self.match_view.setFocus()
-        self.rig_view.setFocus()
+        with self._keep_maya_selection():
+            self.rig_view.select_items(containers)
+            self.match_view.select_items(containers)
+
+    def on_rig_selection_changed(self):
+
+        # Show the candidates of the selected rigs, connected ones marked
+        rig_names = [rig["objectName"]
+                     for rig in self.rig_view.get_selected_items()]
+        self.match_view.set_rigs(rig_names)
+
+    def on_match_selection_changed(self):
+
+        # Highlight the rigs the selected matches can feed
+        compatible = set()
+        for match in self.match_view.get_selected_items():
+            compatible.update(match.get("rigs", []))
+        self.rig_view.model.set_highlighted(compatible)
+
+    def force_refresh(self):
+        """Refresh the tool and read all metadata from disk again"""
+
+        lib.clear_cache()
+        self.refresh()
 
     def refresh(self):
+        """Rebuild all containers, matches and connections
 
-        self.rig_view.clear()
-        self.match_view.clear()
+        The metadata is fetched in a background thread, the scene is scanned
+        in small steps on the main thread. The rigs are shown while the
+        scan continues, the matches once it has finished.
 
-        rig_items = []
-        other_items = []
+        """
+
+        self.cancel_refresh()
+        self._set_busy(True)
+
+        self._profile = profiling.begin("refresh")
+
+        # The scan creates new node hashes, release the plans of the old
+        lib.clear_plan_cache()
+
+        containers = lib.list_containers()
+        representations = [c["representation"] for c in containers
+                           if c["loader"] == "YetiRigLoader"]
+
+        # Keep showing the current items until their containers are
+        # scanned, the views only update the rows which changed
+        names = set(container["objectName"] for container in containers)
+        self._nodes = OrderedDict((name, node) for name, node
+                                  in self._nodes.items() if name in names)
+        self._container_index = None
+        self._pending = []
+        self._last_flush = 0.0
+        self._metadata_errors = set()
+
+        thread = MetadataThread(representations)
+        thread.fetched.connect(self._on_metadata_fetched)
+        thread.incomplete.connect(self._on_metadata_incomplete)
+        thread.failed.connect(self._on_refresh_failed)
+
+        # Keep a reference until the thread is done, also when superseded
+        module.threads = [t for t in module.threads if not t.isFinished()]
+        module.threads.append(thread)
+
+        self._metadata_thread = thread
+        self._refresh_containers = containers
+
+        thread.start()
+
+    def cancel_refresh(self):
+        """Stop the running refresh, the views keep their current items"""
+
+        self._metadata_thread = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        self._set_busy(False)
+        self._end_profile()
+
+    def is_refreshing(self):
+        return self._metadata_thread is not None or self._task is not None
+
+    def _set_busy(self, busy):
+        self.busy_bar.setVisible(busy)
+        self.cancel_button.setVisible(busy)
+
+    def _on_metadata_fetched(self, metadata):
+        if self.sender() is not self._metadata_thread:
+            # Superseded by a newer refresh
+            return
+        self._metadata_thread = None
+        self._metadata = metadata
+
+        containers = self._refresh_containers
+
+        task = ChunkedTask(self._scan(containers, metadata), parent=self)
+        task.progressed.connect(self._flush_pending)
+        task.finished.connect(self._on_scan_finished)
+        task.failed.connect(self._on_refresh_failed)
+
+        self._task = task
+        task.start()
+
+    def _on_metadata_incomplete(self, errors):
+        if self.sender() is not self._metadata_thread:
+            return
+
+        # The refresh continues without the rigs of which the metadata is
+        # missing
+        self._metadata_errors = set(errors)
+        for representation, message in sorted(errors.items()):
+            self.log.error("Could not read metadata of representation %s: "
+                           "%s" % (representation, message))
+
+    def _on_refresh_failed(self, message):
+        sender = self.sender()
+        if sender is not self._metadata_thread and sender is not self._task:
+            return
+
+        self.cancel_refresh()
+        self.log.error("Refresh failed: %s" % message)
+
+    def _scan(self, containers, metadata):
+        """Collect the nodes of each container in small steps
+
+        Args:
+            containers(list): containers of the scene
+            metadata(dict): metadata per representation ID
+
+        Yields:
+            None
+
+        """
+
+        required_ids = lib.get_required_ids(containers, metadata)
+
+        nodes_by_id = {}
+        for chunk in lib.iter_scene_ids(required_ids):
+            for node, value in chunk.items():
+                nodes_by_id.setdefault(value, []).append(node)
+            yield
+
+        self._required_ids = required_ids
+
+        # Collect the rigs first, they are shown while the scan continues
+        containers = sorted(containers,
+                            key=lambda c: c["loader"] != "YetiRigLoader")
+
+        for container in containers:
+            nodes = lib.ContainerNodes(container["objectName"], nodes_by_id)
+            container.update({"nodes": nodes})
 
-        # Separate based on loader
-        for container in lib.get_containers():
             node = lib.create_node(container)
+            self._nodes[container["objectName"]] = node
+            self._pending.append(node)
+            yield
+
+        self._watcher.watch(containers)
+
+    def _flush_pending(self):
+        """Show the rigs which were collected since the last flush
+
+        The matches depend on all rigs and are only looked up once the scan
+        has finished, see `_populate`. The rig view is updated at most once
+        per `FLUSH_INTERVAL`, so the flushes do not add up on large scenes.
+
+        """
+
+        if not self._pending:
+            return
+
+        now = time.time()
+        if now - self._last_flush < FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+
+        pending = self._pending
+        self._pending = []
+        if not any(node["loader"] == "YetiRigLoader" for node in pending):
+            return
+
+        rig_items, other_items = self._split_items()
+        with self._keep_maya_selection():
+            self.rig_view.set_items(rig_items)
+
+    def _on_scan_finished(self):
+        if self.sender() is not self._task:
+            return
+
+        self._task = None
+        self._pending = []
+        self._set_busy(False)
+
+        self._populate()
+        self._end_profile()
+
+        self.log.info("Refreshed ..")
+
+    def _end_profile(self):
+        """Stop recording the refresh or update and show its summary"""
+
+        if self._profile is None:
+            return
+
+        profile = self._profile
+        self._profile = None
+        self._show_profile(profile)
+
+    def _show_profile(self, profile):
+        """Stop recording the operation and show its summary"""
+
+        profile = profiling.end(profile)
+        if profile is None:
+            return
+
+        self.status_label.setText(profile.summary())
+        self.status_label.show()
+
+    @contextlib.contextmanager
+    def _profiled(self, name):
+        """Record an action, a running refresh keeps its own profile"""
+
+        profile = profiling.begin(name)
+        try:
+            yield
+        finally:
+            if profile is not None:
+                self._show_profile(profile)
+
+    def update_containers(self, object_names):
+        """Update only the containers which have changed in the scene
+
+        Containers which were added or removed are picked up as well. Only
+        these containers are collected again, and only the matches and the
+        connection state of their rows are updated.
+
+        Args:
+            object_names(list): names of the containers to update
+
+        Returns:
+            None
+
+        """
+
+        if self.is_refreshing():
+            # The running refresh could already have missed the changes
+            self.refresh()
+            return
+
+        self._profile = profiling.begin("update")
+
+        containers = lib.list_containers()
+
+        # The metadata of new rigs is fetched by a refresh
+        metadata = self._get_metadata(containers)
+        if metadata is None:
+            self._end_profile()
+            self.refresh()
+            return
+
+        # New rigs could require ids which were not collected before
+        required_ids = lib.get_required_ids(containers, metadata)
+        if not required_ids.issubset(self._required_ids):
+            self._end_profile()
+            self.refresh()
+            return
+
+        self._watcher.watch(containers)
+
+        # Only the containers which were changed, added or removed
+        names = set(container["objectName"] for container in containers)
+        removed = set(name for name in self._nodes if name not in names)
+        dirty = set(name for name in object_names if name in names)
+        dirty.update(name for name in names if name not in self._nodes)
+
+        lib.collect_containers_nodes([container for container in containers
+                                      if container["objectName"] in dirty],
+                                     required_ids=required_ids)
+
+        nodes = OrderedDict()
+        for container in containers:
+            object_name = container["objectName"]
+            if object_name in dirty:
+                nodes[object_name] = lib.create_node(container)
+            else:
+                nodes[object_name] = self._nodes[object_name]
+
+        self._nodes = nodes
+        self._container_index = None
+
+        rig_items, other_items = self._split_items()
+        changed = dirty | removed
+        match_items = lib.update_matches(rig_items, other_items, changed,
+                                         metadata)
+
+        with self._keep_maya_selection():
+            self.rig_view.set_items(rig_items)
+            self.match_view.set_items(match_items)
+
+        # Only query the pairs of which the rig or the match has changed
+        changed_rigs = [rig for rig in rig_items
+                        if rig["objectName"] in dirty]
+        changed_matches = [match for match in match_items
+                           if match["objectName"] in dirty]
+
+        connected = {}
+        for rigs, matches in ((changed_rigs, match_items),
+                              (rig_items, changed_matches)):
+            if not rigs or not matches:
+                continue
+            state = lib.get_connected_matches(rigs, matches, metadata)
+            for rig_name, match_names in state.items():
+                connected.setdefault(rig_name, set()).update(match_names)
+
+        self.match_view.model.update_connected(connected, changed)
+
+        # The compatible items of the selection can have changed
+        self.on_rig_selection_changed()
+        self.on_match_selection_changed()
+
+        self._end_profile()
+
+        self.log.info("Updated %i container(s) .." % len(changed))
+
+    def _split_items(self):
+        """Get the rig and other items, separated based on loader"""
+
+        rig_items = []
+        other_items = []
+        for node in self._nodes.values():
             if node["loader"] == "YetiRigLoader":
                 rig_items.append(node)
             else:
                 other_items.append(node)
 
-        match_items = lib.get_matches(rig_items, other_items)
-        print(match_items)
+        return rig_items, other_items
 
-        self.rig_view.add_items(rig_items)
-        self.match_view.add_items(match_items)
+    def _get_metadata(self, containers):
+        """Get the fetched metadata of the rigs among the containers
 
-        self.log.info("Refreshed ..")
+        Args:
+            containers(list): containers of the scene
+
+        Returns:
+            dict or None: None when the metadata of a rig was not fetched
+
+        """
+
+        metadata = {}
+        for container in containers:
+            if container["loader"] != "YetiRigLoader":
+                continue
+
+            key = str(container["representation"])
+            if key in self._metadata_errors:
+                continue
+            if key not in self._metadata:
+                return None
+            metadata[key] = self._metadata[key]
+
+        return metadata
+
+    def _populate(self):
+
+        rig_items, other_items = self._split_items()
+        match_items = lib.get_matches(rig_items, other_items, self._metadata)
+
+        with self._keep_maya_selection():
+            self.rig_view.set_items(rig_items)
+            self.match_view.set_items(match_items)
 
         self._link_connected()
 
+        # The compatible items of the selection can have changed
+        self.on_rig_selection_changed()
+        self.on_match_selection_changed()
+
     def connect_container_nodes(self):
+        """Connect the selected rigs to the selected matches"""
 
-        force = self.force_checkbox.isChecked()
+        pairs = self._get_selected_pairs()
+        if not pairs:
+            return
 
-        rig_node = self._get_rig_node()
-        match_node = self._get_match_node()
+        self._connect_pairs("Connect", pairs)
 
-        # Get needs information
-        connections = lib.get_connections(rig_node["representation"])
-        rig_members_by_id = rig_node["nodes"]
-        input_members_by_id = match_node["nodes"]
+    def connect_all_matched(self):
+        """Connect each rig which has exactly one match"""
 
-        lib.connect(rig_members_by_id, input_members_by_id, connections, force)
+        matches = self.match_view.get_all_items()
 
-        self.refresh()
+        pairs = []
+        skipped = []
+        for rig in self.rig_view.get_all_items():
+            candidates = [match for match in matches
+                          if rig["objectName"] in match.get("rigs", [])]
+            if len(candidates) == 1:
+                pairs.append((rig, candidates[0]))
+                continue
+
+            message = "Found %i matches" % len(candidates)
+            skipped.append({"rig": rig["label"],
+                            "match": "",
+                            "success": False,
+                            "message": message})
+
+        if not pairs:
+            self._report("Connect all matched", skipped)
+            return
+
+        self._connect_pairs("Connect all matched", pairs, skipped=skipped)
+
+    def auto_assign(self):
+        """Preview and apply a one-to-one assignment for all rigs"""
+
+        rig_nodes = self.rig_view.get_all_items()
+        match_nodes = self.match_view.get_all_items()
+
+        plan = lib.get_assignment(rig_nodes, match_nodes, self._metadata)
+        if not plan:
+            self.log.error("No rig could be assigned to a match")
+            return
+
+        lines = ["Assigned %i of %i rigs" % (len(plan), len(rig_nodes))]
+        lines.extend("%s -> %s (coverage: %i%%, namespace: %i%%)"
+                     % (entry["match"]["label"],
+                        entry["rig"]["label"],
+                        entry["coverage"] * 100,
+                        entry["affinity"] * 100) for entry in plan)
+
+        pairs = [(entry["rig"], entry["match"]) for entry in plan]
+        self._connect_pairs("Auto assign", pairs, lines=lines)
 
     def disconnect_container_nodes(self):
+        """Disconnect the selected rigs from the selected matches"""
 
-        rig_node = self._get_rig_node()
-        if not rig_node:
-            self.log.error("Please select one rig item")
+        pairs = self._get_selected_pairs()
+        if not pairs:
+            return
 
-        match_node = self._get_match_node()
-        if not match_node:
-            self.log.error("Please select one match item")
+        with self._profiled("disconnect"):
+            results = lib.disconnect_many(pairs, metadata=self._metadata)
+            self._update_connected()
 
-        connections = lib.get_connections(rig_node["representation"])
+        self._report("Disconnect", results)
 
-        rig_members_by_id = rig_node["nodes"]
-        input_members_by_id = match_node["nodes"]
+    def _connect_pairs(self, action, pairs, lines=None, skipped=None):
+        """Preview the connection changes of the pairs and apply them
 
-        lib.disconnect(rig_members_by_id, input_members_by_id, connections)
+        Only the connections which are not in place yet are made. Existing
+        connections from other sources are replaced when Force is checked.
 
-        self.refresh()
+        Args:
+            action(str): name of the action
+            pairs(list): rig and match node pairs
+            lines(list, optional): extra lines shown in the preview
+            skipped(list, optional): results of the rigs which were not
+                paired, these are added to the report
+
+        Returns:
+            None
+
+        """
+
+        force = self.force_checkbox.isChecked()
+        skipped = list(skipped or [])
+
+        # The preview is recorded apart from the apply, so the time spent in
+        # the dialog is not part of either
+        with self._profiled("preview"):
+            # Leave out the pairs of which the metadata does not fit the
+            # scene
+            reports = lib.validate(pairs, self._metadata)
+            invalid = lib.format_validation(reports)
+            pairs = [pair for pair, report in zip(pairs, reports)
+                     if report["valid"]]
+            diffs = lib.get_connection_diff(pairs, self._metadata)
+
+        for report in reports:
+            if report["valid"]:
+                continue
+            skipped.append({"rig": report["rig"],
+                            "match": report["match"],
+                            "success": False,
+                            "message": "; ".join(issue["message"] for issue
+                                                 in report["issues"])})
+
+        if invalid:
+            lines = list(lines or [])
+            lines.append("Invalid pairs are skipped:")
+            lines.extend(invalid)
+
+        if not self._confirm_diff(action, diffs, force, lines):
+            return
+
+        with self._profiled("connect"):
+            results = lib.apply_connection_diff(diffs, force=force)
+            self._update_connected()
+
+        self._report(action, results + skipped)
+
+    def _confirm_diff(self, action, diffs, force, lines=None):
+        """Show the connection changes and ask to apply them
+
+        Args:
+            action(str): name of the action
+            diffs(list): as returned by `lib.get_connection_diff`
+            force(bool): whether existing connections will be replaced
+            lines(list, optional): extra lines shown above the changes
+
+        Returns:
+            bool: True when the changes should be applied
+
+        """
+
+        add = sum(len(diff["add"]) for diff in diffs)
+        replace = sum(len(diff["replace"]) for diff in diffs)
+        unchanged = sum(len(diff["unchanged"]) for diff in diffs)
+        missing = sum(len(diff["missing"]) for diff in diffs)
+
+        # Nothing to ask when the rigs are already connected
+        if not add and not replace and not missing and not lines:
+            return True
+
+        text = ("%i connection(s) to add, %i to replace, %i unchanged"
+                % (add, replace, unchanged))
+        if replace and not force:
+            text += "\nExisting connections are skipped, check Force to " \
+                    "replace them"
+        if missing:
+            text += "\n%i input(s) could not be found" % missing
+
+        details = list(lines or [])
+        if details:
+            details.append("")
+        details.extend(lib.format_diff(diffs))
+
+        message_box = QtWidgets.QMessageBox(self)
+        message_box.setWindowTitle(action)
+        message_box.setText(text)
+        message_box.setDetailedText("\n".join(details))
+        message_box.setStandardButtons(QtWidgets.QMessageBox.Ok |
+                                       QtWidgets.QMessageBox.Cancel)
+
+        return message_box.exec_() == QtWidgets.QMessageBox.Ok
+
+    def validate(self):
+        """Check the metadata of all rigs against their candidate matches"""
+
+        matches = self.match_view.get_all_items()
+        pairs = [(rig, match) for rig in self.rig_view.get_all_items()
+                 for match in matches
+                 if rig["objectName"] in match.get("rigs", [])]
+        if not pairs:
+            self.log.error("No rig has a match to validate")
+            return
+
+        with self._profiled("validate"):
+            reports = lib.validate(pairs, self._metadata)
+
+        lines = lib.format_validation(reports)
+        invalid = sum(1 for report in reports if not report["valid"])
+
+        summary = "Validate: %i of %i pairs valid" % (len(reports) - invalid,
+                                                      len(reports))
+        self.log.info(summary)
+        for line in lines:
+            self.log.warning(line)
+
+        message_box = QtWidgets.QMessageBox(self)
+        message_box.setWindowTitle("Validate")
+        message_box.setText(summary)
+        if lines:
+            message_box.setDetailedText("\n".join(lines))
+        message_box.setIcon(QtWidgets.QMessageBox.Warning if invalid else
+                            QtWidgets.QMessageBox.Information)
+        message_box.exec_()
+
+    def _get_selected_pairs(self):
+        """Get the selected rig and match pairs which can be connected
+
+        Returns:
+            list
+
+        """
+
+        rig_nodes = self.rig_view.get_selected_items()
+        if not rig_nodes:
+            self.log.error("Please select at least one rig item")
+            return []
+
+        match_nodes = self.match_view.get_selected_items()
+        if not match_nodes:
+            self.log.error("Please select at least one match item")
+            return []
+
+        pairs = []
+        for rig_node in rig_nodes:
+            candidates = [match for match in match_nodes
+                          if rig_node["objectName"] in match.get("rigs", [])]
+            if len(candidates) > 1:
+                self.log.error("Multiple matches selected for rig: %s"
+                               % rig_node["label"])
+                continue
+
+            pairs.extend((rig_node, match) for match in candidates)
+
+        if not pairs:
+            self.log.error("Selected items do not match")
+
+        return pairs
+
+    def _update_connected(self):
+        """Update the connection state without rebuilding the containers"""
+
+        self._link_connected()
+
+    def _report(self, action, results):
+        """Show a summary of the results of a connect or disconnect action
+
+        Args:
+            action(str): name of the action
+            results(list): results as returned by `lib.connect_many`
+
+        Returns:
+            None
+
+        """
+
+        failed = [result for result in results if not result["success"]]
+
+        lines = []
+        for result in results:
+            state = "Failed" if not result["success"] else "Done"
+            line = "%s: %s -> %s" % (state, result["match"], result["rig"])
+            if result["message"]:
+                line += " (%s)" % result["message"]
+            lines.append(line)
+
+        summary = "%s: %i of %i succeeded" % (action,
+                                              len(results) - len(failed),
+                                              len(results))
+        self.log.info(summary)
+        for line in lines:
+            self.log.info(line)
+
+        if not failed and len(results) <= 1:
+            return
+
+        message_box = QtWidgets.QMessageBox(self)
+        message_box.setWindowTitle(action)
+        message_box.setText(summary)
+        message_box.setDetailedText("\n".join(lines))
+        message_box.setIcon(QtWidgets.QMessageBox.Warning if failed else
+                            QtWidgets.QMessageBox.Information)
+        message_box.exec_()
 
     def _get_rig_node(self):
         items = self.rig_view.get_selected_items()
@@ -187,61 +922,28 @@ class Window(QtWidgets.QWidget):
     def _link_connected(self):
 
         rig_model = self.rig_view.model
-        rig_indexes = rig_model.get_indexes()
-
         match_model = self.match_view.model
-        match_indexes = match_model.get_indexes()
 
         node_role = rig_model.NodeRole
 
-        for rig_index in rig_indexes:
-            if not rig_index.isValid():
-                continue
-
-            rig_node = rig_model.data(rig_index, node_role)
-            rig_members_by_id = rig_node["nodes"]
-            connections = lib.get_connections(rig_node["representation"])
+        rig_indexes = [idx for idx in rig_model.get_indexes() if idx.isValid()]
+        match_indexes = [idx for idx in match_model.get_indexes()
+                         if idx.isValid()]
 
-            for match_index in match_indexes:
-                if not match_index.isValid():
-                    continue
-                match_node = match_model.data(match_index, node_role)
-                match_members_by_id = match_node["nodes"]
+        rig_nodes = [rig_model.data(idx, node_role) for idx in rig_indexes]
+        match_nodes = [match_model.data(idx, node_role)
+                       for idx in match_indexes]
 
-                if not lib.are_items_connected(rig_members_by_id,
-                                               match_members_by_id,
-                                               connections):
-                    continue
-                self.log.info("Found connected items..")
+        connected = lib.get_connected_matches(rig_nodes, match_nodes,
+                                              self._metadata)
 
-                match_node.update({"linkedIndex": [rig_index]})
-                break
+        match_model.set_connected(connected)
 
     def _find_rig_node_index(self, label):
-
-        model = self.rig_view.model
-
-        indexes = model.get_indexes()
-        for idx in indexes:
-            if not idx.isValid():
-                continue
-
-            node = model.data(idx, model.NodeRole)
-            if node["label"] == label:
-                return idx
+        return self.rig_view.model.find_index(label)
 
     def _find_match_node_index(self, label):
-
-        model = self.match_view.model
-
-        indexes = model.get_indexes()
-        for idx in indexes:
-            if not idx.isValid():
-                continue
-
-            node = model.data(idx, model.NodeRole)
-            if node["label"] == label:
-                return idx
+        return self.match_view.model.find_index(label)
 
 
 def show(parent=None):
@@ -0,0 +1,321 @@
+"""Connect the Yeti rigs in scene files without the interface
+
+Each scene is processed in its own `mayapy` process, multiple scenes are
+processed in parallel. A JSON report is written per scene.
+
+Example:
+    mayapy -m mayayetirigmanager.batch --workers 4 shot010.ma shot020.ma
+
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import subprocess
+import traceback
+from multiprocessing.pool import ThreadPool
+
+log = logging.getLogger("Yeti Rig Manager")
+
+REPORT_EXTENSION = ".yetirigmanager.json"
+
+
+def initialize():
+    """Initialize Maya standalone and install the Avalon Maya host"""
+
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+
+    import avalon.maya
+    from avalon import api
+    api.install(avalon.maya)
+
+
+def process_scene(path, force=True, save=True, validate_only=False):
+    """Open the scene, auto assign all rigs and connect them
+
+    Args:
+        path(str): scene file to process
+        force(bool): Force connections between nodes, default is True
+        save(bool): save the scene afterwards, default is True
+        validate_only(bool): only validate the metadata of all rigs
+            against all their candidate matches, nothing is connected
+
+    Returns:
+        dict: report of the processed scene
+
+    """
+
+    from maya import cmds
+    from . import lib, profiling
+
+    start = time.time()
+    profile = profiling.begin("batch")
+
+    cmds.file(path, open=True, force=True)
+
+    rig_items = []
+    other_items = []
+    for container in lib.get_containers(lazy=True):
+        node = lib.create_node(container)
+        if node["loader"] == "YetiRigLoader":
+            rig_items.append(node)
+        else:
+            other_items.append(node)
+
+    representations = [node["representation"] for node in rig_items]
+    metadata, errors = lib.prefetch_connections(representations)
+
+    match_items = lib.get_matches(rig_items, other_items, metadata)
+
+    if validate_only:
+        rigs = {node["objectName"]: node for node in rig_items}
+        pairs = [(rigs[name], match) for match in match_items
+                 for name in match["rigs"]]
+        validation = lib.validate(pairs, metadata)
+        invalid = [result for result in validation if not result["valid"]]
+
+        report = {"scene": path,
+                  "success": not invalid and not errors,
+                  "saved": False,
+                  "rigs": len(rig_items),
+                  "matches": len(match_items),
+                  "validated": len(validation),
+                  "invalid": invalid,
+                  "errors": errors,
+                  "duration": time.time() - start}
+
+        if profile is not None:
+            report["profile"] = profiling.end(profile).to_dict()
+
+        return report
+
+    plan = lib.get_assignment(rig_items, match_items, metadata)
+
+    # Leave out the pairs of which the metadata does not fit the scene
+    pairs = [(entry["rig"], entry["match"]) for entry in plan]
+    validation = lib.validate(pairs, metadata) if pairs else []
+    pairs = [pair for pair, result in zip(pairs, validation)
+             if result["valid"]]
+    invalid = [result for result in validation if not result["valid"]]
+
+    # Only make the connections which are not in place yet, so processing
+    # a scene again barely changes it
+    diffs = lib.get_connection_diff(pairs, metadata) if pairs else []
+    changes = sum(len(diff["add"]) + (len(diff["replace"]) if force else 0)
+                  for diff in diffs)
+    results = lib.apply_connection_diff(diffs, force=force)
+
+    assigned = set(entry["rig"]["objectName"] for entry in plan)
+    unassigned = [node["label"] for node in rig_items
+                  if node["objectName"] not in assigned]
+
+    # A partly applied scene is not saved, it is reported as failed
+    failed = [result for result in results if not result["success"]]
+    success = not invalid and not errors and not failed
+    saved = bool(save and changes and not failed)
+    if saved:
+        cmds.file(save=True, force=True)
+    elif save and changes:
+        log.error("Not saving %s, %i pair(s) failed to connect"
+                  % (path, len(failed)))
+
+    report = {"scene": path,
+              "success": success,
+              "saved": saved,
+              "rigs": len(rig_items),
+              "matches": len(match_items),
+              "unassigned": unassigned,
+              "invalid": invalid,
+              "errors": errors,
+              "changes": lib.format_diff(diffs),
+              "results": results,
+              "duration": time.time() - start}
+
+    if profile is not None:
+        report["profile"] = profiling.end(profile).to_dict()
+
+    return report
+
+
+def get_report_path(path, report_dir=None):
+    """Get the path of the report file of the scene
+
+    Args:
+        path(str): scene file
+        report_dir(str, optional): directory for the reports, by default
+            the report is stored next to the scene file
+
+    Returns:
+        str
+
+    """
+    if report_dir:
+        path = os.path.join(report_dir, os.path.basename(path))
+    return path + REPORT_EXTENSION
+
+
+def write_report(report, path):
+    with open(path, "w") as fp:
+        json.dump(report, fp, indent=4, sort_keys=True)
+
+
+def run_worker(path, report_path, force=True, save=True,
+               validate_only=False):
+    """Process a single scene in this process and write its report
+
+    Returns:
+        int: exit code
+
+    """
+
+    from . import profiling
+    profiling.enable_from_environment()
+
+    try:
+        initialize()
+        report = process_scene(path,
+                               force=force,
+                               save=save,
+                               validate_only=validate_only)
+    except Exception:
+        log.error("Failed to process: %s" % path)
+        report = {"scene": path,
+                  "success": False,
+                  "error": traceback.format_exc()}
+
+    write_report(report, report_path)
+
+    return 0 if report["success"] else 1
+
+
+def run(scenes, workers=None, mayapy=None, report_dir=None, force=True,
+        save=True, validate_only=False):
+    """Process the scenes in parallel, each in its own mayapy process
+
+    Args:
+        scenes(list): scene files to process
+        workers(int, optional): amount of scenes processed at the same
+            time, defaults to the amount of CPUs
+        mayapy(str, optional): mayapy executable, defaults to the MAYAPY
+            environment variable or "mayapy"
+        report_dir(str, optional): directory for the reports
+        force(bool): Force connections between nodes, default is True
+        save(bool): save the scenes afterwards, default is True
+        validate_only(bool): only validate the metadata of the rigs
+
+    Returns:
+        list: report per scene
+
+    """
+
+    mayapy = mayapy or os.environ.get("MAYAPY", "mayapy")
+    workers = workers or None
+
+    def process(path):
+        report_path = get_report_path(path, report_dir)
+
+        # The report of an earlier run must never be taken for this run
+        if os.path.exists(report_path):
+            os.remove(report_path)
+
+        # The worker overwrites an empty file of this run, which stays
+        # empty when the worker crashes before it writes its report
+        handle, worker_report_path = tempfile.mkstemp(
+            dir=os.path.dirname(report_path) or ".",
+            suffix=REPORT_EXTENSION)
+        os.close(handle)
+
+        args = [mayapy, "-m", "mayayetirigmanager.batch",
+                "--worker", "--report", worker_report_path]
+        if not force:
+            args.append("--no-force")
+        if not save:
+            args.append("--no-save")
+        if validate_only:
+            args.append("--validate")
+        args.append(path)
+
+        log.info("Processing: %s" % path)
+        try:
+            returncode = subprocess.call(args)
+
+            try:
+                with open(worker_report_path, "r") as fp:
+                    report = json.load(fp)
+            except (IOError, OSError, ValueError):
+                report = {"scene": path,
+                          "success": False,
+                          "error": "Worker exited with code %i" % returncode}
+
+            write_report(report, report_path)
+        finally:
+            os.remove(worker_report_path)
+
+        state = "Done" if report["success"] else "Failed"
+        log.info("%s: %s" % (state, path))
+
+        return report
+
+    pool = ThreadPool(workers)
+    try:
+        return pool.map(process, scenes)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="mayayetirigmanager.batch",
+        description="Connect the Yeti rigs in scene files")
+    parser.add_argument("scenes", nargs="+", help="Scene files to process")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Amount of scenes processed at the same time")
+    parser.add_argument("--mayapy", default=None,
+                        help="mayapy executable used for the workers")
+    parser.add_argument("--report-dir", default=None,
+                        help="Directory for the JSON reports, by default "
+                             "these are stored next to the scenes")
+    parser.add_argument("--no-force", dest="force", action="store_false",
+                        help="Do not override existing connections")
+    parser.add_argument("--no-save", dest="save", action="store_false",
+                        help="Do not save the scenes")
+    parser.add_argument("--validate", dest="validate_only",
+                        action="store_true",
+                        help="Only validate the metadata of the rigs against "
+                             "the scene, nothing is connected or saved")
+    parser.add_argument("--worker", action="store_true",
+                        help=argparse.SUPPRESS)
+    parser.add_argument("--report", default=None, help=argparse.SUPPRESS)
+
+    args = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.worker:
+        path = args.scenes[0]
+        report_path = args.report or get_report_path(path, args.report_dir)
+        return run_worker(path, report_path, force=args.force,
+                          save=args.save, validate_only=args.validate_only)
+
+    reports = run(args.scenes,
+                  workers=args.workers,
+                  mayapy=args.mayapy,
+                  report_dir=args.report_dir,
+                  force=args.force,
+                  save=args.save,
+                  validate_only=args.validate_only)
+
+    failed = [report["scene"] for report in reports if not report["success"]]
+    log.info("Processed %i scene(s), %i failed"
+             % (len(reports), len(failed)))
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+import logging
+
+from maya.api import OpenMaya as om
+
+from avalon.vendor.Qt import QtCore
+
+log = logging.getLogger(__name__)
+
+
+def _strip_namespace(namespace):
+    return (namespace or "").strip(":")
+
+
+class SceneWatcher(QtCore.QObject):
+    """Track changes in the scene which affect the loaded containers
+
+    The Maya callbacks only mark the affected containers as dirty, all
+    changes are collected and emitted at once after a short delay so a
+    burst of changes results in a single update.
+
+    """
+
+    # Object names of the containers which need to be updated
+    changed = QtCore.Signal(list)
+
+    # Emitted when a new scene is opened and all data is invalid
+    reset = QtCore.Signal()
+
+    def __init__(self, parent=None, interval=250):
+        super(SceneWatcher, self).__init__(parent)
+
+        timer = QtCore.QTimer(self)
+        timer.setSingleShot(True)
+        timer.setInterval(interval)
+        timer.timeout.connect(self._emit)
+
+        self._timer = timer
+        self._callback_ids = []
+        self._set_callback_ids = []
+
+        self._containers_by_namespace = {}
+        self._dirty = set()
+        self._reset = False
+
+    def is_registered(self):
+        return bool(self._callback_ids)
+
+    def register(self):
+        """Register the scene callbacks"""
+
+        if self._callback_ids:
+            return
+
+        callback_ids = []
+
+        for message in (om.MSceneMessage.kAfterOpen,
+                        om.MSceneMessage.kAfterNew):
+            callback_ids.append(
+                om.MSceneMessage.addCallback(message, self._on_scene_reset))
+
+        for message in (om.MSceneMessage.kAfterCreateReference,
+                        om.MSceneMessage.kAfterImportReference,
+                        om.MSceneMessage.kAfterLoadReference,
+                        om.MSceneMessage.kAfterUnloadReference,
+                        om.MSceneMessage.kBeforeRemoveReference):
+            callback_ids.append(
+                om.MSceneMessage.addReferenceCallback(message,
+                                                      self._on_reference))
+
+        # New or deleted containers
+        callback_ids.append(
+            om.MDGMessage.addNodeAddedCallback(self._on_set_changed,
+                                               "objectSet"))
+        callback_ids.append(
+            om.MDGMessage.addNodeRemovedCallback(self._on_set_changed,
+                                                 "objectSet"))
+
+        # Renamed nodes and namespaces
+        callback_ids.append(
+            om.MNodeMessage.addNameChangedCallback(om.MObject(),
+                                                   self._on_name_changed))
+
+        self._callback_ids = callback_ids
+
+        log.debug("Registered %i scene callbacks" % len(callback_ids))
+
+    def unregister(self):
+        """Remove all callbacks and discard pending changes"""
+
+        self._timer.stop()
+        self._remove_set_callbacks()
+
+        if self._callback_ids:
+            om.MMessage.removeCallbacks(self._callback_ids)
+            self._callback_ids = []
+
+        self._dirty.clear()
+        self._reset = False
+
+    def watch(self, containers):
+        """Set the containers which are currently shown in the tool
+
+        Args:
+            containers(list): container data, list of dicts
+
+        Returns:
+            None
+
+        """
+
+        self._remove_set_callbacks()
+        self._containers_by_namespace = {}
+
+        callback_ids = []
+        for container in containers:
+            object_name = container["objectName"]
+            namespace = _strip_namespace(container["namespace"])
+            self._containers_by_namespace[namespace] = object_name
+
+            selection = om.MSelectionList()
+            try:
+                selection.add(object_name)
+            except RuntimeError:
+                continue
+
+            callback_ids.append(
+                om.MObjectSetMessage.addSetMembersModifiedCallback(
+                    selection.getDependNode(0),
+                    self._on_members_modified,
+                    object_name))
+
+        self._set_callback_ids = callback_ids
+
+    def _remove_set_callbacks(self):
+        if self._set_callback_ids:
+            om.MMessage.removeCallbacks(self._set_callback_ids)
+            self._set_callback_ids = []
+
+    def _mark_dirty(self, object_name=None):
+        if object_name:
+            self._dirty.add(object_name)
+        self._timer.start()
+
+    def _mark_namespace_dirty(self, namespace):
+        namespace = _strip_namespace(namespace)
+        self._mark_dirty(self._containers_by_namespace.get(namespace))
+
+    def _emit(self):
+        if self._reset:
+            self._reset = False
+            self._dirty.clear()
+            self.reset.emit()
+            return
+
+        dirty = sorted(self._dirty)
+        self._dirty.clear()
+        self.changed.emit(dirty)
+
+    # Maya callbacks
+    def _on_scene_reset(self, client_data=None):
+        self._reset = True
+        self._timer.start()
+
+    def _on_reference(self, reference_node, resolved_file, client_data=None):
+        try:
+            namespace = om.MFnReference(reference_node).associatedNamespace(
+                False)
+        except RuntimeError:
+            namespace = None
+
+        self._mark_namespace_dirty(namespace)
+
+    def _on_set_changed(self, node, client_data=None):
+        self._mark_dirty()
+
+    def _on_members_modified(self, node, object_name):
+        self._mark_dirty(object_name)
+
+    def _on_name_changed(self, node, previous_name, client_data=None):
+        if node.hasFn(om.MFn.kSet):
+            # Container sets are found by their name
+            self._mark_dirty()
+            return
+
+        if ":" not in previous_name:
+            return
+
+        namespace = previous_name.rsplit(":", 1)[0]
+        namespace = _strip_namespace(namespace)
+        if namespace in self._containers_by_namespace:
+            self._mark_namespace_dirty(namespace)
+
+
+class SelectionWatcher(QtCore.QObject):
+    """Emit once after the selection in Maya stopped changing
+
+    Each selection change only restarts a timer, so box selecting a lot of
+    nodes results in a single update.
+
+    """
+
+    changed = QtCore.Signal()
+
+    def __init__(self, parent=None, interval=100):
+        super(SelectionWatcher, self).__init__(parent)
+
+        timer = QtCore.QTimer(self)
+        timer.setSingleShot(True)
+        timer.setInterval(interval)
+        timer.timeout.connect(self.changed)
+
+        self._timer = timer
+        self._callback_id = None
+
+    def register(self):
+        if self._callback_id is not None:
+            return
+
+        self._callback_id = om.MEventMessage.addEventCallback(
+            "SelectionChanged", self._on_selection_changed)
+
+    def unregister(self):
+        self._timer.stop()
+
+        if self._callback_id is not None:
+            om.MMessage.removeCallback(self._callback_id)
+            self._callback_id = None
+
+    def _on_selection_changed(self, client_data=None):
+        self._timer.start()
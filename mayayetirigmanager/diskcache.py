@@ -0,0 +1,324 @@
+"""Persistent cache of the rig metadata shared between Maya sessions
+
+Published representations do not change, so the inputs of their
+.rigsettings files are stored in a SQLite database in the cache directory
+of the user. An entry is used as long as the path, size and modification
+time of the file are the same, which skips the database query, the read
+from the file server and the parsing.
+
+The least recently used entries are removed when the cache grows larger
+than `MAX_SIZE`. Set the YETI_RIG_MANAGER_CACHE environment variable to use
+another directory, or to "0" to disable the cache.
+
+Example:
+    python -m mayayetirigmanager.diskcache --info
+    python -m mayayetirigmanager.diskcache --prune --max-size 64
+    python -m mayayetirigmanager.diskcache --clear
+
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import sqlite3
+
+log = logging.getLogger(__name__)
+
+ENVIRONMENT_VARIABLE = "YETI_RIG_MANAGER_CACHE"
+
+FILENAME = "metadata.sqlite"
+
+# Maximum size of the stored metadata in bytes
+MAX_SIZE = 256 * 1024 * 1024
+
+# Seconds to wait for another session which is writing to the cache
+TIMEOUT = 5.0
+
+_schema = """
+CREATE TABLE IF NOT EXISTS metadata (
+    representation TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS metadata_accessed ON metadata (accessed);
+"""
+
+
+def get_cache_dir():
+    """Get the directory of the cache
+
+    Returns:
+        str or None: None when the cache is disabled
+
+    """
+
+    value = os.environ.get(ENVIRONMENT_VARIABLE)
+    if value == "0":
+        return None
+    if value:
+        return value
+
+    if sys.platform == "win32":
+        root = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        root = os.path.expanduser("~/Library/Caches")
+    else:
+        root = (os.environ.get("XDG_CACHE_HOME") or
+                os.path.expanduser("~/.cache"))
+
+    return os.path.join(root, "yetirigmanager")
+
+
+def get_cache_path():
+    directory = get_cache_dir()
+    if directory is None:
+        return None
+    return os.path.join(directory, FILENAME)
+
+
+def _connect():
+    """Open the database, the connection can not be shared by threads"""
+
+    path = get_cache_path()
+    if path is None:
+        return None
+
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    connection = sqlite3.connect(path, timeout=TIMEOUT)
+    connection.executescript(_schema)
+
+    return connection
+
+
+def _chunks(values, size=500):
+    """Split the values to stay below the SQLite variable limit"""
+    for index in range(0, len(values), size):
+        yield values[index:index + size]
+
+
+def get(representation_ids):
+    """Get the stored metadata of the representations
+
+    Args:
+        representation_ids(list): representation IDs
+
+    Returns:
+        dict: entry per found representation ID with the "path",
+            "signature" (mtime and size of the file) and "metadata"
+
+    """
+
+    keys = [str(key) for key in representation_ids]
+    if not keys:
+        return {}
+
+    entries = {}
+    try:
+        connection = _connect()
+        if connection is None:
+            return {}
+
+        with connection:
+            for chunk in _chunks(keys):
+                rows = connection.execute(
+                    "SELECT representation, path, mtime, size, data "
+                    "FROM metadata WHERE representation IN (%s)"
+                    % ", ".join("?" * len(chunk)), chunk)
+
+                for key, path, mtime, size, data in rows:
+                    entries[key] = {"path": path,
+                                    "signature": (mtime, size),
+                                    "metadata": json.loads(data)}
+
+            connection.executemany(
+                "UPDATE metadata SET accessed = ? WHERE representation = ?",
+                [(time.time(), key) for key in entries])
+
+        connection.close()
+
+    except (sqlite3.Error, OSError, ValueError) as exc:
+        log.warning("Could not read the metadata cache: %s" % exc)
+        return {}
+
+    return entries
+
+
+def put(entries):
+    """Store the metadata of the representations
+
+    Only the inputs of the metadata are stored.
+
+    Args:
+        entries(dict): entry per representation ID with the "path",
+            "signature" (mtime and size of the file) and "metadata"
+
+    Returns:
+        None
+
+    """
+
+    if not entries:
+        return
+
+    now = time.time()
+
+    rows = []
+    for key, entry in entries.items():
+        data = json.dumps({"inputs": entry["metadata"].get("inputs", [])},
+                          separators=(",", ":"))
+        mtime, size = entry["signature"]
+        rows.append((str(key), entry["path"], mtime, size, data, len(data),
+                     now))
+
+    try:
+        connection = _connect()
+        if connection is None:
+            return
+
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO metadata "
+                "(representation, path, mtime, size, data, bytes, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+            _prune(connection, MAX_SIZE)
+
+        connection.close()
+
+    except (sqlite3.Error, OSError) as exc:
+        log.warning("Could not write the metadata cache: %s" % exc)
+
+
+def _prune(connection, max_size):
+    """Remove the least recently used entries above the size"""
+
+    total = connection.execute(
+        "SELECT COALESCE(SUM(bytes), 0) FROM metadata").fetchone()[0]
+    if total <= max_size:
+        return 0
+
+    removed = []
+    rows = connection.execute(
+        "SELECT representation, bytes FROM metadata ORDER BY accessed"
+    ).fetchall()
+    for key, size in rows:
+        if total <= max_size:
+            break
+        removed.append((key,))
+        total -= size
+
+    connection.executemany(
+        "DELETE FROM metadata WHERE representation = ?", removed)
+
+    return len(removed)
+
+
+def prune(max_size=None):
+    """Remove the least recently used entries until the cache fits
+
+    Args:
+        max_size(int, optional): size in bytes, defaults to `MAX_SIZE`
+
+    Returns:
+        int: amount of removed entries
+
+    """
+
+    connection = _connect()
+    if connection is None:
+        return 0
+
+    with connection:
+        removed = _prune(connection,
+                         MAX_SIZE if max_size is None else max_size)
+    connection.execute("VACUUM")
+    connection.close()
+
+    return removed
+
+
+def clear():
+    """Remove all entries from the cache
+
+    Returns:
+        int: amount of removed entries
+
+    """
+
+    connection = _connect()
+    if connection is None:
+        return 0
+
+    with connection:
+        removed = connection.execute("DELETE FROM metadata").rowcount
+    connection.execute("VACUUM")
+    connection.close()
+
+    return removed
+
+
+def info():
+    """Get the location, amount of entries and size of the cache
+
+    Returns:
+        dict
+
+    """
+
+    connection = _connect()
+    if connection is None:
+        return {"path": None, "entries": 0, "size": 0}
+
+    entries, size = connection.execute(
+        "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM metadata").fetchone()
+    connection.close()
+
+    return {"path": get_cache_path(), "entries": entries, "size": size}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="mayayetirigmanager.diskcache",
+        description="Manage the persistent metadata cache")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--info", action="store_true",
+                       help="Show the location and size of the cache")
+    group.add_argument("--prune", action="store_true",
+                       help="Remove the least recently used entries")
+    group.add_argument("--clear", action="store_true",
+                       help="Remove all entries")
+    parser.add_argument("--max-size", type=float, default=None,
+                        help="Size in MB to prune the cache to, defaults "
+                             "to %i" % (MAX_SIZE // (1024 * 1024)))
+
+    args = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.clear:
+        log.info("Removed %i entries" % clear())
+    elif args.prune:
+        max_size = None
+        if args.max_size is not None:
+            max_size = int(args.max_size * 1024 * 1024)
+        log.info("Removed %i entries" % prune(max_size))
+
+    data = info()
+    log.info("%s: %i entries, %.1f MB" % (data["path"],
+                                          data["entries"],
+                                          data["size"] / (1024.0 * 1024.0)))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,61 @@
 import os
-import json
+import re
+import time
 import logging
-from collections import defaultdict
+import difflib
+import multiprocessing
+import threading
+import contextlib
+from collections import defaultdict, deque, OrderedDict
+from multiprocessing.pool import ThreadPool
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
 
 from maya import cmds
+from maya.api import OpenMaya as om
 
 from avalon import io, api
 
 import colorbleed.maya.lib as cb
 
+from . import profiling, sidecar, diskcache, apiundo
+
 log = logging.getLogger(__name__)
 
+# Maximum amount of parsed metadata files kept in memory
+CACHE_SIZE = 256
+
+# Parsed metadata per representation id, least recently used first
+_metadata_cache = OrderedDict()
+
+# The metadata can be fetched from a background thread
+_metadata_lock = threading.RLock()
+
+# Maximum amount of metadata files read at the same time
+FETCH_WORKERS = 8
+
+# Seconds to wait for a single metadata file
+FETCH_TIMEOUT = 30.0
+
+# Maximum amount of connection plans kept in memory
+PLAN_CACHE_SIZE = 8192
+
+# Connection plans per node hash and metadata, least recently used first
+_plan_cache = OrderedDict()
+
+
+@contextlib.contextmanager
+def undo_chunk():
+    """Group all commands run in this context into a single undo step"""
+    cmds.undoInfo(openChunk=True)
+    try:
+        yield
+    finally:
+        cmds.undoInfo(closeChunk=True)
+
 
 def get_workfile():
     """Get work file name
@@ -23,42 +68,336 @@ def get_workfile():
     return os.path.basename(path)
 
 
-def create_id_hash(nodes):
+def get_plug_ids(plugs, required_ids=None):
+    """Read the cbId plugs through a single selection list
+
+    Args:
+        plugs (list): cbId plugs of which the node is stored by its long
+            name, e.g. as listed by `ls`
+        required_ids (set, optional): only collect the nodes with these ids
+
+    Returns:
+        dict: cbId per node, DAG nodes are stored by their full path
+
+    """
+    selection = om.MSelectionList()
+    for plug in plugs:
+        selection.add(plug)
+
+    if selection.length() == len(plugs):
+        values = [selection.getPlug(index).asString()
+                  for index in range(len(plugs))]
+    else:
+        # Plugs which resolve to the same item are merged, read the plugs
+        # one by one to keep them apart
+        values = []
+        for plug in plugs:
+            selection.clear()
+            selection.add(plug)
+            values.append(selection.getPlug(0).asString())
+
+    ids = {}
+    for plug, value in zip(plugs, values):
+        if not value:
+            continue
+
+        if required_ids is not None and value not in required_ids:
+            continue
+
+        ids[plug.rsplit(".", 1)[0]] = value
+
+    return ids
+
+
+def get_node_ids(nodes, required_ids=None):
+    """Get the cbIds of the nodes with a single `ls` and selection list
+
+    Args:
+        nodes (list): long names of the nodes
+        required_ids (set, optional): only collect the nodes with these ids
+
+    Returns:
+        dict: cbId per node
+
+    """
+    if not nodes:
+        return {}
+
+    # Only the nodes which have the attribute are listed
+    plugs = cmds.ls(["%s.cbId" % node for node in nodes], long=True) or []
+
+    return get_plug_ids(plugs, required_ids)
+
+
+def iter_scene_ids(required_ids=None, chunk_size=1000):
+    """Iterate the cbIds of all nodes in the scene in chunks
+
+    Only the nodes which have the attribute are listed, with a single `ls`
+    call, instanced nodes are listed with each of their paths. The values
+    are read per chunk of `chunk_size` nodes, after each chunk the ids
+    collected so far are yielded. This allows the caller to spread the
+    work over time.
+
+    Args:
+        required_ids (set, optional): only collect the nodes with these ids
+        chunk_size (int): amount of nodes read per chunk
+
+    Yields:
+        dict: cbId per node, DAG nodes are stored by their full path
+
+    """
+    plugs = cmds.ls("*.cbId", recursive=True, long=True) or []
+
+    for start in range(0, len(plugs), chunk_size):
+        yield get_plug_ids(plugs[start:start + chunk_size], required_ids)
+
+
+@profiling.timed("cbIds")
+def get_scene_ids(required_ids=None):
+    """Get the cbId of every node in the scene in a single pass
+
+    Instead of querying the attribute per node the nodes which have it are
+    listed once and read in bulk, see `iter_scene_ids`.
+
+    Args:
+        required_ids (set, optional): only store the nodes with these ids
+
+    Returns:
+        dict: cbId per node, DAG nodes are stored by their full path
+
+    """
+    scene_ids = {}
+    for chunk in iter_scene_ids(required_ids):
+        scene_ids.update(chunk)
+
+    return scene_ids
+
+
+@profiling.timed("cbIds")
+def create_id_hash(nodes, scene_ids=None, required_ids=None):
     """Create a hash based on cbId attribute value
     Args:
         nodes (list): a list of nodes
+        scene_ids (dict, optional): cbId per node as returned by
+            `get_scene_ids`, when not given the id is queried per node
+        required_ids (set, optional): only store the nodes with these ids
 
     Returns:
         dict
     """
     node_id_hash = defaultdict(list)
     for node in nodes:
-        value = cb.get_id(node)
+        if scene_ids is None:
+            value = cb.get_id(node)
+        else:
+            value = scene_ids.get(node)
+
         if value is None:
             continue
 
+        if required_ids is not None and value not in required_ids:
+            continue
+
         node_id_hash[value].append(node)
 
     return dict(node_id_hash)
 
 
-def get_containers():
+def list_containers():
+    """List all containers in the scene without collecting their nodes
+
+    Returns:
+        list
+
+    """
+    host = api.registered_host()
+    return list(host.ls())
+
+
+class ContainerNodes(Mapping):
+    """Nodes of a container by cbId which are resolved on demand
+
+    Only the ids of the shared scene hash are resolved, the members of the
+    container are queried on first access and the nodes per id are
+    memoized.
+
+    Args:
+        object_name (str): name of the container set
+        nodes_by_id (dict): nodes per cbId of the whole scene
+
+    """
+
+    def __init__(self, object_name, nodes_by_id):
+        self._object_name = object_name
+        self._nodes_by_id = nodes_by_id
+        self._members = None
+        self._resolved = {}
+
+    @profiling.timed("members")
+    def _get_members(self):
+        if self._members is None:
+            nodes = cmds.sets(self._object_name, query=True, nodesOnly=True)
+            self._members = set(cmds.ls(nodes, long=True)) if nodes else set()
+        return self._members
+
+    def _resolve(self, _id):
+        try:
+            return self._resolved[_id]
+        except KeyError:
+            pass
+
+        nodes = self._nodes_by_id.get(_id, [])
+        if nodes:
+            members = self._get_members()
+            nodes = [node for node in nodes if node in members]
+
+        self._resolved[_id] = nodes
+        return nodes
+
+    def __getitem__(self, _id):
+        nodes = self._resolve(_id)
+        if not nodes:
+            raise KeyError(_id)
+        return nodes
+
+    def __iter__(self):
+        for _id in self._nodes_by_id:
+            if self._resolve(_id):
+                yield _id
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def _fetch_rig_metadata(rigs, metadata=None):
+    """Get the metadata of the rigs, fetched at once when not given
+
+    Args:
+        rigs (list): rig nodes or containers
+        metadata (dict, optional): metadata per representation ID
+
+    Returns:
+        dict: metadata per representation ID
+
+    """
+    if metadata is not None:
+        return metadata
+
+    return get_connections_bulk([rig["representation"] for rig in rigs])
+
+
+def get_required_ids(containers, metadata=None):
+    """Get the ids which are used by the connections of the rigs
+
+    Args:
+        containers (list): containers of the scene
+        metadata (dict, optional): metadata per representation ID, when
+            not given it will be fetched for all rigs at once
+
+    Returns:
+        set
+
+    """
+    metadata = _fetch_rig_metadata([c for c in containers
+                                    if c["loader"] == "YetiRigLoader"],
+                                   metadata)
+
+    required_ids = set()
+    for rig_metadata in metadata.values():
+        for input in rig_metadata.get("inputs", []):
+            required_ids.add(input["sourceID"])
+            required_ids.add(input["destinationID"])
+
+    return required_ids
+
+
+@profiling.timed("members")
+def collect_container_nodes(container, scene_ids=None, required_ids=None):
+    """Collect the nodes of the container and store them by cbId
+
+    Args:
+        container (dict): container data
+        scene_ids (dict, optional): cbId per node as returned by
+            `get_scene_ids`
+        required_ids (set, optional): only store the nodes with these ids
+
+    Returns:
+        dict: the updated container
+
+    """
+    nodes = cmds.sets(container["objectName"], query=True, nodesOnly=True)
+    nodes = cmds.ls(nodes, long=True)
+
+    # Update container
+    id_hash = create_id_hash(nodes, scene_ids, required_ids)
+    container.update({"nodes": id_hash})
+
+    return container
+
+
+@profiling.timed("members")
+def collect_containers_nodes(containers, required_ids=None):
+    """Collect the nodes of the containers and store them by cbId
+
+    The ids of the members of all containers are read at once, see
+    `get_node_ids`, instead of querying the attribute per node.
+
+    Args:
+        containers (list): container data
+        required_ids (set, optional): only store the nodes with these ids
+
+    Returns:
+        list: the updated containers
+
+    """
+    members = get_container_members([container["objectName"]
+                                     for container in containers])
+
+    nodes = [node for names in members.values() for node in names]
+    node_ids = get_node_ids(nodes, required_ids)
+
+    for container in containers:
+        id_hash = create_id_hash(members[container["objectName"]],
+                                 node_ids, required_ids)
+        container.update({"nodes": id_hash})
+
+    return containers
+
+
+def get_containers(use_index=True, lazy=False):
     """Collect all containers in the scene and collect all their nodes
 
+    Args:
+        use_index (bool): collect the cbIds of the whole scene in a single
+            pass instead of querying them per node, default is True
+        lazy (bool): only collect the nodes with the ids which are used by
+            the connections of the rigs, these are resolved per container
+            on first access. This implies `use_index`, default is False
+
     Returns:
         generator object
 
     """
-    host = api.registered_host()
+    containers = list_containers()
+
+    if lazy:
+        required_ids = get_required_ids(containers)
+
+        nodes_by_id = defaultdict(list)
+        for node, value in get_scene_ids(required_ids).items():
+            nodes_by_id[value].append(node)
+        nodes_by_id = dict(nodes_by_id)
 
-    for container in host.ls():
-        nodes = cmds.sets(container["objectName"], query=True, nodesOnly=True)
-        nodes = cmds.ls(nodes, long=True)
+        for container in containers:
+            nodes = ContainerNodes(container["objectName"], nodes_by_id)
+            container.update({"nodes": nodes})
+            yield container
+        return
 
-        # Update container
-        container.update({"nodes": create_id_hash(nodes)})
+    scene_ids = get_scene_ids() if use_index else None
 
-        yield container
+    for container in containers:
+        yield collect_container_nodes(container, scene_ids)
 
 
 def create_node(container):
@@ -73,6 +412,8 @@ def create_node(container):
     """
     label = "%s - %s" % (container["namespace"], container["name"])
     return {"label": label,
+            "objectName": container["objectName"],
+            "namespace": container["namespace"],
             "nodes": container.get("nodes", []),
             "representation": container["representation"],
             "loader": container["loader"]
@@ -96,8 +437,117 @@ def get_source_ids(connections):
     return list(set(c["sourceID"] for c in connections))
 
 
-def get_matches(rig_items, other_items):
-    """Yields each item which matches for a Yeti rig
+def create_source_index(items):
+    """Create a lookup of items per cbId of their nodes
+
+    Args:
+        items (list): items from the scene, list of dicts
+
+    Returns:
+        dict: list of items per cbId
+
+    """
+    index = defaultdict(list)
+    for item in items:
+        for _id in item["nodes"]:
+            index[_id].append(item)
+
+    return dict(index)
+
+
+def get_container_members(object_names):
+    """Get the member nodes of the containers by their long name
+
+    Args:
+        object_names(list): names of the container sets
+
+    Returns:
+        dict: long names of the members per container
+
+    """
+    members = {}
+    for object_name in object_names:
+        nodes = cmds.sets(object_name, query=True, nodesOnly=True)
+        members[object_name] = cmds.ls(nodes, long=True) if nodes else []
+
+    return members
+
+
+@profiling.timed("members")
+def create_container_index(object_names):
+    """Get the containers per member node
+
+    Args:
+        object_names(list): names of the container sets
+
+    Returns:
+        dict: container names per long node name
+
+    """
+    index = defaultdict(list)
+    for object_name, nodes in get_container_members(object_names).items():
+        for node in nodes:
+            index[node].append(object_name)
+
+    return dict(index)
+
+
+def get_node_containers(nodes, index):
+    """Get the containers of the nodes or of their closest parent
+
+    Args:
+        nodes(list): long node names
+        index(dict): as returned by `create_container_index`
+
+    Returns:
+        set: names of the containers
+
+    """
+    containers = set()
+    for node in nodes:
+        while node:
+            owners = index.get(node)
+            if owners:
+                containers.update(owners)
+                break
+            node = node.rsplit("|", 1)[0]
+
+    return containers
+
+
+def get_selected_nodes():
+    """Get the long names of the selected nodes
+
+    Selected components and plugs are resolved to their node, e.g. a
+    vertex of a mesh to the mesh shape.
+
+    """
+    nodes = cmds.ls(selection=True, long=True, objectsOnly=True) or []
+    return list(OrderedDict.fromkeys(nodes))
+
+
+def select_containers(object_names):
+    """Select the members of the containers in a single `select` call
+
+    Args:
+        object_names(list): names of the container sets
+
+    Returns:
+        None
+
+    """
+    object_names = cmds.ls(object_names) if object_names else []
+    if not object_names:
+        cmds.select(clear=True)
+        return
+
+    # Selecting a set selects its members
+    cmds.select(object_names, replace=True)
+
+
+@profiling.timed("matches")
+def get_matches(rig_items, other_items, metadata=None):
+    """Get each item which matches for a Yeti rig
 
     The matching is based on the unique ID which is stored per
     unique connection in the connection data of the rig.
@@ -109,162 +559,1761 @@ def get_matches(rig_items, other_items):
             "destinationID: "098765432112345:123456"
          }
 
+    Each item is returned only once, the object names of the rigs it can
+    be connected to are stored under the "rigs" key of each other item.
+
     Args:
         rig_items (list): list of Yeti rig nodes, list of dicts
         other_items (list): other items from scene, list of dicts
+        metadata (dict, optional): metadata per representation ID, when
+            not given it will be fetched for all rig items at once
 
     Returns:
-        generator object
+        list
 
     """
 
-    # Get connection data per node
+    metadata = _fetch_rig_metadata(rig_items, metadata)
+
+    index = create_source_index(other_items)
+
+    rigs_by_match = defaultdict(list)
     for node in rig_items:
-        metadata = get_connections(node["representation"])
-        connections = metadata["inputs"]
+        node_metadata = metadata.get(str(node["representation"]), {})
+        connections = node_metadata.get("inputs", [])
 
-        # Get the ids of the sources
-        source_ids = get_source_ids(connections)
+        # Get matches based on the ids of the sources
+        matched = set()
+        for _id in get_source_ids(connections):
+            for other in index.get(_id, []):
+                matched.add(other["objectName"])
 
-        # Get matches based on the ids
-        for other in other_items:
-            node_data = other["nodes"]
-            if any(_id for _id in source_ids if _id in node_data):
-                yield other
+        for object_name in matched:
+            rigs_by_match[object_name].append(node["objectName"])
 
+    matches = []
+    for other in other_items:
+        other["rigs"] = rigs_by_match.get(other["objectName"], [])
+        if other["rigs"]:
+            matches.append(other)
+
+    return matches
 
-def get_connections(representation_id):
-    """Get the metadata file from the data base
+
+@profiling.timed("matches")
+def update_matches(rig_items, other_items, object_names, metadata):
+    """Update the matches of the rigs and other items which have changed
+
+    Only the rigs which can be connected to a changed item and the items
+    which can be connected to a changed rig are looked up again, the
+    others keep the "rigs" stored by `get_matches`.
 
     Args:
-        representation_id(str): representation ID
+        rig_items (list): list of Yeti rig nodes, list of dicts
+        other_items (list): other items from scene, list of dicts
+        object_names (set): containers which were changed, added or
+            removed
+        metadata (dict): metadata per representation ID
 
     Returns:
-        dict
+        list: the matches, see `get_matches`
+
     """
 
-    representation = io.find_one({"_id": io.ObjectId(representation_id)})
+    order = {}
+    source_ids = OrderedDict()
+    for index, rig in enumerate(rig_items):
+        rig_metadata = metadata.get(str(rig["representation"]), {})
+        source_ids[rig["objectName"]] = get_source_ids(
+            rig_metadata.get("inputs", []))
+        order[rig["objectName"]] = index
 
-    path = api.get_representation_path(representation)
-    path = path.replace("\\", "/")
+    changed_rigs = [name for name in source_ids if name in object_names]
 
-    # Get metadata
-    path, ext = os.path.splitext(path)
-    data_path = "{}.rigsettings".format(path)
+    def can_feed(other, rig_name):
+        nodes = other["nodes"]
+        return any(_id in nodes for _id in source_ids[rig_name])
 
-    with open(data_path, "r") as fp:
-        metadata = json.load(fp)
+    matches = []
+    for other in other_items:
+        if other["objectName"] in object_names or "rigs" not in other:
+            rigs = [name for name in source_ids if can_feed(other, name)]
+        else:
+            rigs = [name for name in other["rigs"]
+                    if name in order and name not in object_names]
+            rigs.extend(name for name in changed_rigs
+                        if can_feed(other, name))
+            rigs.sort(key=order.get)
 
-    return metadata
+        other["rigs"] = rigs
+        if rigs:
+            matches.append(other)
 
+    return matches
 
-def are_items_connected(rig_members_by_id, input_members_by_id, connections):
-    """Check if the rig members are connected to the input members based
-    on the connections from the metadata
+
+def get_namespace_affinity(namespace, other):
+    """Score how likely two namespaces belong to the same instance
+
+    The score is based on the similarity of the names, matching instance
+    numbers (e.g. "char_01_" and "char_01_yeti_") weigh in the most.
 
     Args:
-        rig_members_by_id(dict):  node hash based on cbId
-        input_members_by_id(dict): node hash based on cbId
-        connections(dict): metadata from the meta data file
+        namespace(str): namespace of the rig
+        other(str): namespace of the candidate
 
     Returns:
-        BOOL
+        float: value between 0.0 and 1.0
 
     """
+    namespace = (namespace or "").strip(":")
+    other = (other or "").strip(":")
 
-    for input in connections.get("inputs", []):
+    similarity = difflib.SequenceMatcher(None, namespace, other).ratio()
 
-        input_nodes = input_members_by_id.get(input["sourceID"])
-        input_node = input_nodes[0]
+    numbers = [int(n) for n in re.findall(r"\d+", namespace)]
+    other_numbers = [int(n) for n in re.findall(r"\d+", other)]
+    if numbers and other_numbers and numbers[-1] == other_numbers[-1]:
+        return 0.5 + similarity * 0.5
 
-        rig_nodes = rig_members_by_id.get(input["destinationID"])
-        rig_node = rig_nodes[0]
-
-        connections = input["connections"]
-        input_attr = "%s.%s" % (input_node, connections[0])
-        rig_attr = "%s.%s" % (rig_node, connections[1])
-
-        if cmds.isConnected(input_attr, rig_attr):
-            return True
+    return similarity * 0.5
 
-    return False
 
+@profiling.timed("assignment")
+def get_assignment(rig_items, match_items, metadata=None):
+    """Assign one match to each rig for the whole scene
 
-def connect(rig_members_by_id, input_members_by_id, connections, force=True):
-    """Create a connection between source and input based on the meta data
+    The candidates of each rig are scored on the coverage of the source
+    IDs of the rig and on namespace affinity. The assignment is a maximum
+    one-to-one matching, preferring the best scoring candidates.
 
     Args:
-        rig_members_by_id(dict):  source data from the source item
-        input_members_by_id(dict): input data from the input item
-        connections(dict): metadata from the meta data file
-
-        force(bool): Force connections between nodes, default is True
+        rig_items (list): list of Yeti rig nodes, list of dicts
+        match_items (list): matches as returned by `get_matches`
+        metadata (dict, optional): metadata per representation ID, when
+            not given it will be fetched for all rig items at once
 
     Returns:
-        None
+        list: the plan, a dict per rig with the assigned "rig" and "match"
+            nodes, the "coverage" and "affinity" scores of the match
 
     """
 
-    for input in connections.get("inputs", []):
+    metadata = _fetch_rig_metadata(rig_items, metadata)
 
-        input_nodes = input_members_by_id.get(input["sourceID"])
-        input_node = input_nodes[0]
+    matches_by_name = {match["objectName"]: match for match in match_items}
 
-        rig_nodes = rig_members_by_id.get(input["destinationID"])
-        rig_node = rig_nodes[0]
+    matches_by_rig = defaultdict(list)
+    for match in match_items:
+        for rig_name in match.get("rigs", []):
+            matches_by_rig[rig_name].append(match)
 
-        connections = input["connections"]
-        input_attr = "%s.%s" % (input_node, connections[0])
-        rig_attr = "%s.%s" % (rig_node, connections[1])
-
-        # Create easy to read attribute for messages
-        src = input_attr.rsplit("|", 1)[-1]
-        dest = rig_attr.rsplit("|", 1)[-1]
+    # Score and sort the candidates of each rig, best first
+    rigs_by_name = OrderedDict()
+    candidates = {}
+    scores = {}
+    for rig in rig_items:
+        rig_name = rig["objectName"]
+        rig_metadata = metadata.get(str(rig["representation"]), {})
+        source_ids = get_source_ids(rig_metadata.get("inputs", []))
+        if not source_ids:
+            continue
 
-        if cmds.isConnected(input_attr, rig_attr):
-            log.error("Source already connected to destination: %s -> %s" %
-                      (src, dest))
+        for match in matches_by_rig.get(rig_name, []):
+            found = sum(1 for _id in source_ids if _id in match["nodes"])
+            coverage = float(found) / len(source_ids)
+            affinity = get_namespace_affinity(rig["namespace"],
+                                              match["namespace"])
+            scores[(rig_name, match["objectName"])] = (coverage, affinity)
+
+        names = [match["objectName"] for match in
+                 matches_by_rig.get(rig_name, [])]
+        names.sort(key=lambda name: scores[(rig_name, name)], reverse=True)
+
+        rigs_by_name[rig_name] = rig
+        candidates[rig_name] = names
+
+    # Assign the rigs with the strongest candidates first
+    best = {name: scores[(name, names[0])] if names else (0.0, 0.0)
+            for name, names in candidates.items()}
+    order = sorted(rigs_by_name, key=lambda name: best[name], reverse=True)
+
+    rig_by_match = {}
+    match_by_rig = {}
+    for rig_name in order:
+        _find_augmenting_path(rig_name, candidates, rig_by_match,
+                              match_by_rig)
+
+    plan = []
+    for rig_name, rig in rigs_by_name.items():
+        match_name = match_by_rig.get(rig_name)
+        if match_name is None:
             continue
 
-        log.info("Connecting: %s -> %s" % (src, dest))
+        coverage, affinity = scores[(rig_name, match_name)]
+        plan.append({"rig": rig,
+                     "match": matches_by_name[match_name],
+                     "coverage": coverage,
+                     "affinity": affinity})
 
-        cmds.connectAttr(input_attr, rig_attr, force=force)
+    return plan
 
 
-def disconnect(rig_members_by_id, input_members_by_id, connections):
-    """Break all connections between source and input nodes
+def _find_augmenting_path(rig_name, candidates, rig_by_match, match_by_rig):
+    """Assign the rig by searching for an augmenting path
+
+    Breadth first search over alternating paths, when a free match is
+    found the assignments along the path are shifted by one.
 
     Args:
-        rig_members_by_id(dict):  node hash based on cbId
-        input_members_by_id(dict): node hash based on cbId
-        connections(dict): metadata from the meta data file
+        rig_name(str): the unassigned rig
+        candidates(dict): sorted candidate match names per rig name
+        rig_by_match(dict): current assignment, updated in place
+        match_by_rig(dict): current assignment, updated in place
+
+    Returns:
+        bool: True if the rig got assigned
+
+    """
+
+    parents = {}
+    visited = set([rig_name])
+    queue = deque([rig_name])
+    while queue:
+        current = queue.popleft()
+        for match_name in candidates[current]:
+            if match_name in parents:
+                continue
+            parents[match_name] = current
+
+            owner = rig_by_match.get(match_name)
+            if owner is None:
+                # Shift the assignments along the path
+                while match_name is not None:
+                    rig = parents[match_name]
+                    previous = match_by_rig.get(rig)
+                    rig_by_match[match_name] = rig
+                    match_by_rig[rig] = match_name
+                    match_name = previous
+                return True
+
+            if owner not in visited:
+                visited.add(owner)
+                queue.append(owner)
+
+    return False
+
+
+def clear_cache():
+    """Clear the cached metadata so the next lookup reads from disk again
 
     Returns:
         None
 
     """
+    with _metadata_lock:
+        _metadata_cache.clear()
 
-    for connection in connections.get("inputs", []):
+    clear_plan_cache()
 
-        input_nodes = input_members_by_id.get(connection["sourceID"])
-        input_node = input_nodes[0]
 
-        rig_nodes = rig_members_by_id.get(connection["destinationID"])
-        rig_node = rig_nodes[0]
+def clear_plan_cache():
+    """Clear the cached connection plans
 
-        connections = connection["connections"]
-        input_attr = "%s.%s" % (input_node, connections[0])
-        rig_attr = "%s.%s" % (rig_node, connections[1])
+    The plans hold the node hashes of the containers they were built from,
+    clearing them releases the hashes of containers which are not used
+    anymore.
 
-        # Create easy to read attribute for messages
-        src = input_attr.rsplit("|", 1)[-1]
-        dest = rig_attr.rsplit("|", 1)[-1]
+    Returns:
+        None
 
-        if not cmds.isConnected(input_attr, rig_attr):
-            log.error("Source already disconnected from destination: %s -/- %s"
-                      % (src, dest))
-            continue
+    """
+    _plan_cache.clear()
 
-        log.info("Disconnecting: %s -> %s" % (src, dest))
 
-        cmds.disconnectAttr(input_attr, rig_attr)
+def get_data_path(representation):
+    """Get the path of the metadata file which belongs to the representation
+
+    Args:
+        representation(dict): representation document
+
+    Returns:
+        str
+
+    """
+    path = api.get_representation_path(representation)
+    path = path.replace("\\", "/")
+
+    path, ext = os.path.splitext(path)
+    return "{}.rigsettings".format(path)
+
+
+def get_connections(representation_id):
+    """Get the metadata file from the data base
+
+    Args:
+        representation_id(str): representation ID
+
+    Raises:
+        RuntimeError: the metadata could not be read
+
+    Returns:
+        dict
+    """
+
+    key = str(representation_id)
+    metadata, errors = prefetch_connections([representation_id])
+    if key not in metadata:
+        raise RuntimeError("Could not read metadata of representation %s: "
+                           "%s" % (key, errors.get(key, "Unknown error")))
+
+    return metadata[key]
+
+
+def get_connections_bulk(representation_ids):
+    """Get the metadata files of multiple representations at once
+
+    All representations which are not cached yet are fetched with a single
+    database query. The parsed metadata is cached per representation and
+    only read again when the modification time or size of the file has
+    changed. The inputs are read from the compact index next to the file
+    when it is up to date, see `sidecar`. Metadata read in earlier sessions
+    is taken from the persistent cache, see `diskcache`.
+
+    The files are read concurrently, see `prefetch_connections`. Metadata
+    which could not be read is logged and left out of the result.
+
+    Args:
+        representation_ids(list): representation IDs
+
+    Returns:
+        dict: metadata per representation ID
+
+    """
+
+    metadata, errors = prefetch_connections(representation_ids)
+    for key, message in errors.items():
+        log.error("Could not read metadata of %s: %s" % (key, message))
+
+    return metadata
+
+
+def prefetch_connections(representation_ids, workers=None, timeout=None):
+    """Read the metadata files of the representations concurrently
+
+    The cached entries are checked against the modification time and size
+    of their file. The paths of the other representations are resolved and
+    their files are read in a bounded pool of threads, so reading from
+    network storage takes about as long as the slowest file instead of the
+    sum of all files. A file which fails or takes longer than the timeout
+    does not stop the others.
+
+    The in-memory cache is only locked while it is read and updated, other
+    threads can use it while the files are read.
+
+    Args:
+        representation_ids(list): representation IDs
+        workers(int, optional): maximum amount of threads, defaults to
+            `FETCH_WORKERS`
+        timeout(float, optional): seconds to wait for each file, defaults
+            to `FETCH_TIMEOUT`
+
+    Returns:
+        tuple: metadata and error message per representation ID
+
+    """
+
+    return _get_connections_bulk(representation_ids, workers, timeout)
+
+
+def _get_signature(path):
+    """Get the modification time and size of the file"""
+    stat = os.stat(path)
+    return stat.st_mtime, stat.st_size
+
+
+def _read_metadata(data_path, representation=None):
+    """Read the metadata file
+
+    Args:
+        data_path(str or None): the .rigsettings file, resolved from the
+            representation when None
+        representation(dict, optional): representation document
+
+    Raises:
+        RuntimeError: the file could not be read, the message names the
+            file and the original error
+
+    Returns:
+        dict: cache entry with the "path", "signature" and "metadata"
+
+    """
+
+    if data_path is None:
+        data_path = get_data_path(representation)
+
+    try:
+        signature = _get_signature(data_path)
+        metadata = sidecar.load(data_path, signature)
+    except (IOError, OSError, ValueError) as exc:
+        raise RuntimeError("Could not read %s: %s" % (data_path, exc))
+
+    return {"path": data_path,
+            "signature": signature,
+            "metadata": metadata}
+
+
+def _run_concurrent(function, arguments, workers=None, timeout=None):
+    """Call the function with the arguments of each key in a thread pool
+
+    The timeout starts when a call starts, calls which are still queued
+    are not timed. A call which timed out keeps its thread, when all
+    threads are taken by such calls the remaining calls are skipped.
+
+    Args:
+        function(callable): thread safe function
+        arguments(OrderedDict): positional arguments per key
+        workers(int, optional): maximum amount of threads, defaults to
+            `FETCH_WORKERS`
+        timeout(float, optional): seconds to wait for each call, defaults
+            to `FETCH_TIMEOUT`
+
+    Returns:
+        tuple: result and exception per key, a call which did not finish
+            in time has a multiprocessing.TimeoutError
+
+    """
+
+    results = {}
+    errors = {}
+    if not arguments:
+        return results, errors
+
+    workers = max(min(workers or FETCH_WORKERS, len(arguments)), 1)
+    if timeout is None:
+        timeout = FETCH_TIMEOUT
+
+    started = {}
+
+    def call(key, args):
+        started[key] = time.time()
+        return function(*args)
+
+    pool = ThreadPool(workers)
+    try:
+        pending = [(key, pool.apply_async(call, (key, args)))
+                   for key, args in arguments.items()]
+        pool.close()
+
+        stuck = []
+        for key, result in pending:
+            while not result.ready():
+                begun = started.get(key)
+                if begun is None:
+                    # Queued calls only start when a thread is free
+                    stuck = [other for other in stuck if not other.ready()]
+                    if len(stuck) >= workers:
+                        break
+                    result.wait(0.01)
+                    continue
+
+                remaining = begun + timeout - time.time()
+                if remaining <= 0:
+                    break
+                result.wait(remaining)
+
+            if result.ready():
+                try:
+                    results[key] = result.get()
+                except Exception as exc:
+                    errors[key] = exc
+            elif key in started:
+                stuck.append(result)
+                errors[key] = multiprocessing.TimeoutError(
+                    "Timed out after %.1f seconds" % timeout)
+            else:
+                errors[key] = multiprocessing.TimeoutError(
+                    "Skipped, all threads timed out")
+    finally:
+        pool.terminate()
+
+    return results, errors
+
+
+@profiling.timed("metadata")
+def _get_connections_bulk(representation_ids, workers=None, timeout=None):
+    keys = []
+    for representation_id in representation_ids:
+        key = str(representation_id)
+        if key not in keys:
+            keys.append(key)
+
+    with _metadata_lock:
+        cached = dict((key, _metadata_cache[key]) for key in keys
+                      if key in _metadata_cache)
+
+    # Use the metadata of previous sessions, as long as the file exists the
+    # database does not have to be queried
+    from_disk = diskcache.get([key for key in keys if key not in cached])
+    cached.update(from_disk)
+
+    # Checking a cached entry is a single stat, only files which have to be
+    # read go to the thread pool
+    entries = {}
+    stale = {}
+    errors = {}
+    for key, entry in cached.items():
+        try:
+            signature = _get_signature(entry["path"])
+        except OSError as exc:
+            # The file of a previous session can have been moved, get its
+            # current path from the database instead
+            if key not in from_disk:
+                errors[key] = str(exc)
+            continue
+
+        if entry["signature"] == signature:
+            entries[key] = entry
+        else:
+            stale[key] = entry["path"]
+
+    missing = [key for key in keys
+               if key not in entries and key not in stale and
+               key not in errors]
+
+    representations = {}
+    if missing:
+        object_ids = [io.ObjectId(key) for key in missing]
+        for representation in io.find({"_id": {"$in": object_ids}}):
+            representations[str(representation["_id"])] = representation
+
+    arguments = OrderedDict()
+    for key in keys:
+        if key in stale:
+            arguments[key] = (stale[key], None)
+        elif key in representations:
+            arguments[key] = (None, representations[key])
+        elif key in missing:
+            errors[key] = "Could not find representation"
+
+    loaded, failed = _run_concurrent(_read_metadata, arguments,
+                                     workers, timeout)
+    for key, exc in failed.items():
+        errors[key] = str(exc) or exc.__class__.__name__
+
+    entries.update(loaded)
+    diskcache.put(loaded)
+
+    with _metadata_lock:
+        for key in keys:
+            _metadata_cache.pop(key, None)
+            if key in entries:
+                # Store as most recently used
+                _metadata_cache[key] = entries[key]
+
+        # Evict the least recently used entries
+        while len(_metadata_cache) > CACHE_SIZE:
+            _metadata_cache.popitem(last=False)
+
+    result = dict((key, entries[key]["metadata"]) for key in keys
+                  if key in entries)
+
+    return result, errors
+
+
+def get_node_namespace(node):
+    """Get the namespace of the node without the leading colon
+
+    Args:
+        node(str): name or full path of the node
+
+    Returns:
+        str: empty when the node is not in a namespace
+
+    """
+    name = node.rsplit("|", 1)[-1]
+    if ":" not in name:
+        return ""
+    return name.rsplit(":", 1)[0].lstrip(":")
+
+
+def partition_by_namespace(nodes):
+    """Get the first node per namespace
+
+    Args:
+        nodes(list): names or full paths of nodes
+
+    Returns:
+        OrderedDict: node per namespace
+
+    """
+    partition = OrderedDict()
+    for node in nodes:
+        partition.setdefault(get_node_namespace(node), node)
+    return partition
+
+
+def _get_instance_keys(namespaces):
+    """Get the namespaces without the parent namespace shared by all"""
+
+    parts = [namespace.split(":") if namespace else []
+             for namespace in namespaces]
+
+    common = 0
+    if len(parts) > 1:
+        shortest = min(len(part) for part in parts)
+        while (common < shortest and
+               all(part[common] == parts[0][common] for part in parts)):
+            common += 1
+
+    return [":".join(part[common:]) for part in parts]
+
+
+def _get_instance_number(key):
+    numbers = re.findall(r"\d+", key)
+    return int(numbers[-1]) if numbers else None
+
+
+def _index_unique(items):
+    """Get the value per key, keys with multiple values are left out"""
+
+    index = {}
+    ambiguous = set()
+    for key, value in items:
+        if key is None:
+            continue
+        if index.setdefault(key, value) != value:
+            ambiguous.add(key)
+
+    for key in ambiguous:
+        del index[key]
+
+    return index
+
+
+def pair_namespaces(rig_namespaces, input_namespaces):
+    """Pair each instance of the rig with an instance of the input
+
+    Instances are paired on their namespace relative to the namespace
+    shared by all instances of the same side, e.g. "crowd_yeti:char_01"
+    with "crowd:char_01", then on their instance number. A key or number
+    which belongs to multiple instances of a side is not used.
+
+    Instances which can not be paired this way are left out, so their
+    inputs are reported as missing instead of connected to a guessed
+    instance.
+
+    Args:
+        rig_namespaces(list): namespaces of the rig nodes
+        input_namespaces(list): namespaces of the input nodes
+
+    Returns:
+        dict: input namespace per paired rig namespace
+
+    """
+
+    inputs = sorted(set(input_namespaces))
+    rigs = sorted(set(rig_namespaces))
+    if not inputs or not rigs:
+        return {}
+
+    input_keys = _get_instance_keys(inputs)
+    by_key = _index_unique(zip(input_keys, inputs))
+    by_number = _index_unique((_get_instance_number(key), namespace)
+                              for key, namespace in zip(input_keys, inputs))
+
+    rig_keys = _get_instance_keys(rigs)
+    rig_numbers = _index_unique((_get_instance_number(key), namespace)
+                                for key, namespace in zip(rig_keys, rigs))
+
+    pairs = {}
+    used = set()
+    for namespace, key in zip(rigs, rig_keys):
+        other = by_key.get(key)
+        if other is None or other in used:
+            number = _get_instance_number(key)
+            other = None
+            if rig_numbers.get(number) == namespace:
+                other = by_number.get(number)
+
+        if other is None or other in used:
+            continue
+
+        pairs[namespace] = other
+        used.add(other)
+
+    return pairs
+
+
+class ConnectionPlan(object):
+    """Resolved plugs to connect the nodes of a match to a rig
+
+    The plan is built once per rig and match pair from the metadata of the
+    rig, see `get_connection_plan`. Inputs of which the source or
+    destination id can not be found are collected in `missing`.
+
+    When a container holds multiple instances of an asset the nodes of an
+    id are partitioned by namespace. The instances of the rig and the
+    input are paired once per plan, see `pair_namespaces`, and each rig
+    node is connected to the node of the paired instance. Inputs of rig
+    instances which could not be paired are collected in `missing`.
+
+    Args:
+        rig_members_by_id(dict):  node hash based on cbId
+        input_members_by_id(dict): node hash based on cbId
+        connections(dict): metadata from the meta data file
+
+    """
+
+    __slots__ = ("plugs", "missing", "_sources")
+
+    def __init__(self, rig_members_by_id, input_members_by_id, connections):
+
+        resolved = []
+        missing = []
+        rig_namespaces = set()
+        input_namespaces = set()
+        for input in connections.get("inputs", []):
+            input_nodes = input_members_by_id.get(input["sourceID"])
+            rig_nodes = rig_members_by_id.get(input["destinationID"])
+            if not input_nodes or not rig_nodes:
+                missing.append(input)
+                continue
+
+            rig_nodes = partition_by_namespace(rig_nodes)
+            input_nodes = partition_by_namespace(input_nodes)
+            rig_namespaces.update(rig_nodes)
+            input_namespaces.update(input_nodes)
+
+            resolved.append((input, rig_nodes, input_nodes))
+
+        pairs = None
+        if len(rig_namespaces) > 1 or len(input_namespaces) > 1:
+            pairs = pair_namespaces(rig_namespaces, input_namespaces)
+
+            # Namespaces of instances, other inputs can be shared
+            paired = set(pairs.values())
+
+        plugs = []
+        for input, rig_nodes, input_nodes in resolved:
+            src_attr, dest_attr = input["connections"]
+
+            for namespace, rig_node in rig_nodes.items():
+                if pairs is None:
+                    input_node = next(iter(input_nodes.values()))
+                else:
+                    input_node = input_nodes.get(pairs.get(namespace))
+
+                # E.g. one source shared by all instances, which is not
+                # in the namespace of another instance
+                if (input_node is None and len(input_nodes) == 1 and
+                        next(iter(input_nodes)) not in paired):
+                    input_node = next(iter(input_nodes.values()))
+
+                if input_node is None:
+                    missing.append(input)
+                    continue
+
+                plugs.append(("%s.%s" % (input_node, src_attr),
+                              "%s.%s" % (rig_node, dest_attr)))
+
+        # Source and destination plug per input
+        self.plugs = tuple(plugs)
+        self.missing = tuple(missing)
+
+        # Used to validate the cached plan
+        self._sources = (rig_members_by_id, input_members_by_id, connections)
+
+    def is_built_from(self, rig_members_by_id, input_members_by_id,
+                      connections):
+        """Check if the plan was built from these exact objects"""
+        return all(a is b for a, b in zip(self._sources,
+                                          (rig_members_by_id,
+                                           input_members_by_id,
+                                           connections)))
+
+    def check(self):
+        """Raise an error when not all inputs could be resolved
+
+        Raises:
+            ValueError
+
+        """
+        if not self.missing:
+            return
+
+        ids = ", ".join("%s -> %s" % (i["sourceID"], i["destinationID"])
+                        for i in self.missing)
+        raise ValueError("Could not find the nodes of %i input(s): %s"
+                         % (len(self.missing), ids))
+
+
+def _short_plug(plug):
+    """Get an easy to read plug for messages"""
+    return plug.rsplit("|", 1)[-1]
+
+
+def get_connection_plan(rig_members_by_id, input_members_by_id, connections):
+    """Get the cached connection plan of the rig and input nodes
+
+    A plan stays cached as long as the same node hashes and metadata are
+    used, these are replaced when a container or metadata file changes.
+
+    Args:
+        rig_members_by_id(dict):  node hash based on cbId
+        input_members_by_id(dict): node hash based on cbId
+        connections(dict): metadata from the meta data file
+
+    Returns:
+        ConnectionPlan
+
+    """
+
+    key = (id(rig_members_by_id), id(input_members_by_id), id(connections))
+
+    plan = _plan_cache.pop(key, None)
+    if plan is None or not plan.is_built_from(rig_members_by_id,
+                                              input_members_by_id,
+                                              connections):
+        plan = ConnectionPlan(rig_members_by_id,
+                              input_members_by_id,
+                              connections)
+
+    # Store as most recently used and evict the oldest plans
+    _plan_cache[key] = plan
+    while len(_plan_cache) > PLAN_CACHE_SIZE:
+        _plan_cache.popitem(last=False)
+
+    return plan
+
+
+def are_items_connected(rig_members_by_id, input_members_by_id, connections):
+    """Check if the rig members are connected to the input members based
+    on the connections from the metadata
+
+    Args:
+        rig_members_by_id(dict):  node hash based on cbId
+        input_members_by_id(dict): node hash based on cbId
+        connections(dict): metadata from the meta data file
+
+    Returns:
+        BOOL
+
+    """
+
+    plan = get_connection_plan(rig_members_by_id,
+                               input_members_by_id,
+                               connections)
+
+    for input_attr, rig_attr in plan.plugs:
+        if cmds.isConnected(input_attr, rig_attr):
+            return True
+
+    return False
+
+
+def _split_plug(plug):
+    """Split a plug in its node and attribute name without array index"""
+    node, attr = plug.split(".", 1)
+    return node, attr.split("[", 1)[0]
+
+
+def _get_long_name(selection, index):
+    """Get the long name of an item of the selection list"""
+    try:
+        return selection.getDagPath(index).fullPathName()
+    except TypeError:
+        # Not a DAG node, its name is unique
+        node = selection.getDependNode(index)
+        return om.MFnDependencyNode(node).name()
+
+
+def _get_long_names(nodes):
+    """Get the long names of the nodes in a single selection list
+
+    Each name is resolved on its own, names which match no node or more
+    than one node are left out.
+
+    Args:
+        nodes(list): node names
+
+    Returns:
+        dict: long name per node name
+
+    """
+    nodes = list(OrderedDict.fromkeys(nodes))
+
+    selection = om.MSelectionList()
+    indices = []
+    merged = []
+    for node in nodes:
+        length = selection.length()
+        try:
+            selection.add(node)
+        except RuntimeError:
+            # No object or more than one object matches the name
+            continue
+
+        added = selection.length() - length
+        if added == 1:
+            indices.append((node, length))
+        elif not added:
+            # Same node as an earlier name, e.g. its short and long name
+            merged.append(node)
+
+    result = dict((node, _get_long_name(selection, index))
+                  for node, index in indices)
+
+    for node in merged:
+        selection.clear()
+        selection.add(node)
+        result[node] = _get_long_name(selection, 0)
+
+    return result
+
+
+def get_incoming_connections(plugs):
+    """Get the source plugs which are connected to the given plugs
+
+    All plugs are queried in a single `listConnections` call.
+
+    Args:
+        plugs(list): destination plugs
+
+    Returns:
+        set: (source node, source attribute, destination node, destination
+            attribute) per connection, nodes are stored by their long name
+
+    """
+    if not plugs:
+        return set()
+
+    try:
+        result = cmds.listConnections(plugs,
+                                      source=True,
+                                      destination=False,
+                                      plugs=True,
+                                      connections=True) or []
+    except ValueError:
+        # One of the plugs does not exist, query the others one by one
+        result = []
+        for plug in plugs:
+            try:
+                result.extend(cmds.listConnections(plug,
+                                                   source=True,
+                                                   destination=False,
+                                                   plugs=True,
+                                                   connections=True) or [])
+            except ValueError:
+                log.warning("Could not query connections of: %s" % plug)
+
+    # The result is a flat list of destination and source pairs
+    pairs = [(_split_plug(result[i + 1]), _split_plug(result[i]))
+             for i in range(0, len(result), 2)]
+
+    nodes = [node for pair in pairs for node, attr in pair]
+    long_names = _get_long_names(nodes)
+
+    incoming = set()
+    for (src_node, src_attr), (dest_node, dest_attr) in pairs:
+        incoming.add((long_names.get(src_node, src_node),
+                      src_attr,
+                      long_names.get(dest_node, dest_node),
+                      dest_attr))
+
+    return incoming
+
+
+@profiling.timed("connection state")
+def get_connected_matches(rig_items, match_items, metadata=None):
+    """Get the matches which are connected to each rig
+
+    The destination plugs of all rigs are queried at once, the state of
+    each rig and match pair is resolved with set lookups afterwards.
+
+    Args:
+        rig_items (list): list of Yeti rig nodes, list of dicts
+        match_items (list): matches as returned by `get_matches`
+        metadata (dict, optional): metadata per representation ID, when
+            not given it will be fetched for all rig items at once
+
+    Returns:
+        dict: object names of connected matches per rig object name
+
+    """
+
+    metadata = _fetch_rig_metadata(rig_items, metadata)
+
+    matches_by_rig = defaultdict(list)
+    for match in match_items:
+        for rig_name in match.get("rigs", []):
+            matches_by_rig[rig_name].append(match)
+
+    # Collect the expected connections per rig and match pair
+    expected = {}
+    plugs = OrderedDict()
+    for rig in rig_items:
+        connections = metadata.get(str(rig["representation"]), {})
+
+        for match in matches_by_rig.get(rig["objectName"], []):
+            plan = get_connection_plan(rig["nodes"],
+                                       match["nodes"],
+                                       connections)
+
+            pairs = []
+            for input_attr, rig_attr in plan.plugs:
+                plugs[rig_attr] = None
+                pairs.append(_split_plug(input_attr) + _split_plug(rig_attr))
+
+            key = (rig["objectName"], match["objectName"])
+            expected[key] = pairs
+
+    incoming = get_incoming_connections(list(plugs))
+
+    connected = {rig["objectName"]: [] for rig in rig_items}
+    for (rig_name, match_name), pairs in expected.items():
+        if any(pair in incoming for pair in pairs):
+            connected[rig_name].append(match_name)
+
+    return connected
+
+
+@profiling.timed("diff")
+def get_connection_diff(pairs, metadata=None):
+    """Compare the current connections with the connections of each pair
+
+    The destination plugs of all pairs are queried at once. Each input
+    of a pair ends up in one of these lists:
+        add: the destination has no incoming connection
+        replace: the destination is connected to another source, the
+            current sources are stored as the third value
+        unchanged: the source is already connected to the destination
+
+    Args:
+        pairs(list): rig and match node pairs
+        metadata (dict, optional): metadata per representation ID, when
+            not given it will be fetched for all rigs at once
+
+    Returns:
+        list: a dict per pair with the "rig" and "match" nodes, the
+            "add", "replace" and "unchanged" plug pairs and the "missing"
+            inputs of which the nodes could not be found
+
+    """
+
+    metadata = _fetch_rig_metadata([rig for rig, match in pairs], metadata)
+
+    plans = []
+    plugs = OrderedDict()
+    for rig, match in pairs:
+        connections = metadata.get(str(rig["representation"]), {})
+        plan = get_connection_plan(rig["nodes"], match["nodes"], connections)
+        for input_attr, rig_attr in plan.plugs:
+            plugs[rig_attr] = None
+        plans.append(plan)
+
+    sources_by_destination = defaultdict(list)
+    for src_node, src_attr, dest_node, dest_attr in \
+            get_incoming_connections(list(plugs)):
+        sources_by_destination[(dest_node, dest_attr)].append(
+            "%s.%s" % (src_node, src_attr))
+
+    diffs = []
+    for (rig, match), plan in zip(pairs, plans):
+        diff = {"rig": rig,
+                "match": match,
+                "add": [],
+                "replace": [],
+                "unchanged": [],
+                "missing": list(plan.missing)}
+
+        for input_attr, rig_attr in plan.plugs:
+            current = sources_by_destination.get(_split_plug(rig_attr), [])
+            if not current:
+                diff["add"].append((input_attr, rig_attr))
+            elif "%s.%s" % _split_plug(input_attr) in current:
+                diff["unchanged"].append((input_attr, rig_attr))
+            else:
+                diff["replace"].append((input_attr, rig_attr, current))
+
+        diffs.append(diff)
+
+    return diffs
+
+
+def format_diff(diffs):
+    """Get readable lines of the connection changes
+
+    Args:
+        diffs(list): as returned by `get_connection_diff`
+
+    Returns:
+        list
+
+    """
+    lines = []
+    for diff in diffs:
+        lines.append("%s -> %s: %i to add, %i to replace, %i unchanged"
+                     % (diff["match"]["label"],
+                        diff["rig"]["label"],
+                        len(diff["add"]),
+                        len(diff["replace"]),
+                        len(diff["unchanged"])))
+
+        for input_attr, rig_attr in diff["add"]:
+            lines.append("    + %s -> %s" % (_short_plug(input_attr),
+                                             _short_plug(rig_attr)))
+
+        for input_attr, rig_attr, current in diff["replace"]:
+            current = ", ".join(_short_plug(plug) for plug in current)
+            lines.append("    ~ %s -> %s (replaces %s)"
+                         % (_short_plug(input_attr),
+                            _short_plug(rig_attr),
+                            current))
+
+        for input in diff["missing"]:
+            lines.append("    ! missing %s -> %s" % (input["sourceID"],
+                                                      input["destinationID"]))
+
+    return lines
+
+
+def apply_connection_diff(diffs, force=True, use_modifier=True):
+    """Make only the connections which are not in place yet
+
+    All changes are made in a single undo chunk. Inputs which are already
+    connected are skipped, other sources are only replaced when forced.
+
+    Args:
+        diffs(list): as returned by `get_connection_diff`
+        force(bool): replace the existing sources, default is True
+        use_modifier(bool): make all changes with a single modifier when
+            the undo plug-in is available, see `ConnectionModifier`
+
+    Returns:
+        list: result per pair, see `connect_many`
+
+    """
+
+    def get_changes(diff):
+        if diff["missing"]:
+            ids = ", ".join(i["sourceID"] for i in diff["missing"])
+            raise ValueError("Could not find: %s" % ids)
+
+        changes = list(diff["add"])
+        if force:
+            changes.extend((src, dest) for src, dest, current
+                           in diff["replace"])
+
+        skipped = 0 if force else len(diff["replace"])
+        message = ("%i connected, %i unchanged, %i skipped"
+                   % (len(changes), len(diff["unchanged"]), skipped))
+
+        return [("connect", src, dest) for src, dest in changes], message
+
+    return _apply_changes([(diff["rig"], diff["match"], diff)
+                           for diff in diffs],
+                          get_changes,
+                          force=force,
+                          use_modifier=use_modifier)
+
+
+def get_existing_plugs(plugs):
+    """Get the plugs of which the node and attribute exist
+
+    All plugs are queried in a single `ls` call, array indices are ignored.
+
+    Args:
+        plugs(list): plugs with the long name of the node
+
+    Returns:
+        set: the existing plugs without array index
+
+    """
+    plugs = list(OrderedDict.fromkeys("%s.%s" % _split_plug(plug)
+                                      for plug in plugs))
+    if not plugs:
+        return set()
+
+    return set(cmds.ls(plugs, long=True) or [])
+
+
+def get_attribute_type(plug):
+    """Get a description of the data of the plug to compare it
+
+    Args:
+        plug(str): plug name
+
+    Returns:
+        tuple: kind of attribute and its data type
+
+    """
+
+    selection = om.MSelectionList()
+    selection.add(plug)
+    attribute = selection.getPlug(0).attribute()
+
+    if attribute.hasFn(om.MFn.kTypedAttribute):
+        return "typed", om.MFnTypedAttribute(attribute).attrType()
+    if attribute.hasFn(om.MFn.kGenericAttribute):
+        return "generic", None
+    if (attribute.hasFn(om.MFn.kNumericAttribute) or
+            attribute.hasFn(om.MFn.kUnitAttribute) or
+            attribute.hasFn(om.MFn.kEnumAttribute)):
+        return "numeric", None
+    if attribute.hasFn(om.MFn.kMessageAttribute):
+        return "message", None
+    if attribute.hasFn(om.MFn.kMatrixAttribute):
+        return "matrix", None
+    if attribute.hasFn(om.MFn.kCompoundAttribute):
+        return "compound", om.MFnCompoundAttribute(attribute).numChildren()
+
+    return attribute.apiTypeStr, None
+
+
+def is_compatible(source_type, destination_type):
+    """Check if a plug of the source type can drive the destination type
+
+    Args:
+        source_type(tuple): as returned by `get_attribute_type`
+        destination_type(tuple): as returned by `get_attribute_type`
+
+    Returns:
+        bool
+
+    """
+    if "generic" in (source_type[0], destination_type[0]):
+        return True
+
+    if source_type[0] != destination_type[0]:
+        return False
+
+    if source_type[0] == "typed":
+        return (om.MFnData.kAny in (source_type[1], destination_type[1]) or
+                source_type[1] == destination_type[1])
+
+    return source_type[1] == destination_type[1]
+
+
+@profiling.timed("validation")
+def validate(pairs, metadata=None):
+    """Check the metadata of the rigs against the nodes of their matches
+
+    For all pairs at once it is checked whether the ids of each input can
+    be found, whether the attributes exist and whether the type of the
+    source can be connected to the destination. The node types and plugs
+    are queried in bulk and the attribute type is looked up once per node
+    type and attribute.
+
+    Args:
+        pairs(list): rig and match node pairs
+        metadata (dict, optional): metadata per representation ID, when
+            not given it will be fetched for all rigs at once
+
+    Returns:
+        list: a dict per pair with the "rig" and "match" labels, "valid"
+            and the "issues", each issue is a dict with the "type" and a
+            "message"
+
+    """
+
+    metadata = _fetch_rig_metadata([rig for rig, match in pairs], metadata)
+
+    reports = []
+    plans = []
+    plugs = []
+    for rig, match in pairs:
+        report = {"rig": rig["label"],
+                  "match": match["label"],
+                  "valid": True,
+                  "issues": []}
+        reports.append(report)
+
+        connections = metadata.get(str(rig["representation"]))
+        if connections is None:
+            report["issues"].append({
+                "type": "metadata",
+                "message": "No metadata found for: %s" % rig["label"]})
+            plans.append(None)
+            continue
+
+        plan = get_connection_plan(rig["nodes"], match["nodes"], connections)
+        plans.append(plan)
+
+        for input in plan.missing:
+            issues = []
+            for key, nodes in (("sourceID", match["nodes"]),
+                               ("destinationID", rig["nodes"])):
+                if input[key] in nodes:
+                    continue
+                issues.append({"type": "missing id",
+                               "id": input[key],
+                               "message": "Could not find %s: %s"
+                                          % (key, input[key])})
+
+            # Both ids exist, but not in the paired instance
+            if not issues:
+                issues.append({"type": "missing instance",
+                               "id": input["sourceID"],
+                               "message": "Could not find the instance of "
+                                          "sourceID: %s" % input["sourceID"]})
+
+            report["issues"].extend(issues)
+
+        for src, dest in plan.plugs:
+            plugs.extend((src, dest))
+
+    existing = get_existing_plugs(plugs)
+
+    nodes = list(OrderedDict.fromkeys(_split_plug(plug)[0]
+                                      for plug in existing))
+    node_types = {}
+    if nodes:
+        listed = cmds.ls(nodes, long=True, showType=True) or []
+        node_types = dict(zip(listed[::2], listed[1::2]))
+
+    attribute_types = {}
+
+    def get_type(plug):
+        node, attr = _split_plug(plug)
+        key = (node_types.get(node, node), attr)
+        if key not in attribute_types:
+            try:
+                attribute_types[key] = get_attribute_type(plug)
+            except RuntimeError:
+                attribute_types[key] = None
+        return attribute_types[key]
+
+    for report, plan in zip(reports, plans):
+        if plan is None:
+            continue
+
+        for src, dest in plan.plugs:
+            missing = [plug for plug in (src, dest)
+                       if "%s.%s" % _split_plug(plug) not in existing]
+            for plug in missing:
+                report["issues"].append({
+                    "type": "missing attribute",
+                    "plug": _short_plug(plug),
+                    "message": "Attribute does not exist: %s"
+                               % _short_plug(plug)})
+            if missing:
+                continue
+
+            src_type = get_type(src)
+            dest_type = get_type(dest)
+            if src_type is None or dest_type is None:
+                continue
+
+            if not is_compatible(src_type, dest_type):
+                report["issues"].append({
+                    "type": "incompatible",
+                    "plug": _short_plug(dest),
+                    "message": "Can not connect %s to %s"
+                               % (_short_plug(src), _short_plug(dest))})
+
+    for report in reports:
+        report["valid"] = not report["issues"]
+
+    return reports
+
+
+def format_validation(reports):
+    """Get readable lines of the issues of the invalid pairs
+
+    Args:
+        reports(list): as returned by `validate`
+
+    Returns:
+        list
+
+    """
+    lines = []
+    for report in reports:
+        if report["valid"]:
+            continue
+
+        lines.append("%s -> %s: %i issue(s)" % (report["match"],
+                                                report["rig"],
+                                                len(report["issues"])))
+        lines.extend("    %s" % issue["message"]
+                     for issue in report["issues"])
+
+    return lines
+
+
+class ConnectionModifier(object):
+    """Queue connections and disconnections to make them all at once
+
+    Each plug is resolved once and all changes are made with a single
+    `MDGModifier.doIt()`, which is undoable as one command through
+    `apiundo`. The state of the destinations includes the queued changes,
+    so the changes can be queued per rig and match pair.
+
+    """
+
+    def __init__(self):
+        self._modifier = om.MDGModifier()
+        self._plugs = {}
+        self._sources = {}
+        self.count = 0
+
+    def _get_plug(self, name):
+        plug = self._plugs.get(name)
+        if plug is None:
+            selection = om.MSelectionList()
+            try:
+                selection.add(name)
+            except RuntimeError:
+                raise ValueError("No object matches name: %s" % name)
+
+            plug = selection.getPlug(0)
+            self._plugs[name] = plug
+
+        return plug
+
+    def _get_source(self, name, plug):
+        """Get the source of the destination including the queued changes"""
+        if name in self._sources:
+            return self._sources[name]
+
+        sources = plug.connectedTo(True, False)
+        return sources[0] if sources else None
+
+    def queue(self, changes, force=True):
+        """Queue the changes of a single rig and match pair
+
+        All plugs are resolved and checked before anything is queued, so
+        either all or none of the changes are queued. Connections which
+        are already made and disconnections of sources which are not
+        connected are skipped.
+
+        Args:
+            changes(list): "connect" or "disconnect" with the source and
+                destination plug
+            force(bool): disconnect other sources of the destinations,
+                default is True
+
+        Raises:
+            ValueError: a plug could not be found
+            RuntimeError: a destination is connected to another source and
+                force is disabled
+
+        Returns:
+            int: the amount of queued changes
+
+        """
+
+        operations = []
+        sources = {}
+        for action, source_name, destination_name in changes:
+            source = self._get_plug(source_name)
+            destination = self._get_plug(destination_name)
+
+            if destination_name in sources:
+                current = sources[destination_name]
+            else:
+                current = self._get_source(destination_name, destination)
+
+            src = _short_plug(source_name)
+            dest = _short_plug(destination_name)
+
+            if action == "connect":
+                if current is not None and current == source:
+                    log.error("Source already connected to destination: "
+                              "%s -> %s" % (src, dest))
+                    continue
+
+                if current is not None and not force:
+                    raise RuntimeError("Destination already has an incoming "
+                                       "connection: %s" % dest)
+
+                log.info("Connecting: %s -> %s" % (src, dest))
+                operations.append((current, source, destination))
+                sources[destination_name] = source
+
+            else:
+                if current is None or current != source:
+                    log.error("Source already disconnected from "
+                              "destination: %s -/- %s" % (src, dest))
+                    continue
+
+                log.info("Disconnecting: %s -> %s" % (src, dest))
+                operations.append((source, None, destination))
+                sources[destination_name] = None
+
+        for current, source, destination in operations:
+            if current is not None:
+                self._modifier.disconnect(current, destination)
+            if source is not None:
+                self._modifier.connect(source, destination)
+
+        self._sources.update(sources)
+        self.count += len(operations)
+
+        return len(operations)
+
+    def doIt(self):
+        """Make all queued changes as a single undoable command"""
+        if self.count:
+            apiundo.commit(self._modifier)
+
+
+class ConnectionCommands(object):
+    """Make connections and disconnections with `maya.cmds`
+
+    Used when the undo plug-in is not available, it has the interface of
+    `ConnectionModifier` but each change is made when it is queued. Wrap
+    the changes in an `undo_chunk` to undo them at once.
+
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def queue(self, changes, force=True):
+        """Make the changes of a single rig and match pair
+
+        Connections which are already made and disconnections of sources
+        which are not connected are skipped.
+
+        Args:
+            changes(list): "connect" or "disconnect" with the source and
+                destination plug
+            force(bool): disconnect other sources of the destinations,
+                default is True
+
+        Returns:
+            int: the amount of changes made
+
+        """
+
+        count = 0
+        for action, source, destination in changes:
+
+            # Create easy to read attribute for messages
+            src = _short_plug(source)
+            dest = _short_plug(destination)
+
+            connected = cmds.isConnected(source, destination)
+            if action == "connect":
+                if connected:
+                    log.error("Source already connected to destination: "
+                              "%s -> %s" % (src, dest))
+                    continue
+
+                log.info("Connecting: %s -> %s" % (src, dest))
+                cmds.connectAttr(source, destination, force=force)
+
+            else:
+                if not connected:
+                    log.error("Source already disconnected from "
+                              "destination: %s -/- %s" % (src, dest))
+                    continue
+
+                log.info("Disconnecting: %s -> %s" % (src, dest))
+                cmds.disconnectAttr(source, destination)
+
+            count += 1
+
+        self.count += count
+
+        return count
+
+    def doIt(self):
+        """The changes are already made when they are queued"""
+
+
+def _new_result(rig, match):
+    """Get the result of a rig and match pair, see `connect_many`"""
+    return {"rig": rig["label"],
+            "match": match["label"],
+            "success": True,
+            "message": ""}
+
+
+def _apply_changes(items, get_changes, force=True, use_modifier=True):
+    """Make the changes of each pair in a single undo chunk
+
+    The changes are made with a single `ConnectionModifier` when the undo
+    plug-in is available, otherwise with `ConnectionCommands`. A failing
+    pair does not stop the other pairs.
+
+    Args:
+        items(list): rig node, match node and data per pair
+        get_changes(function): get the changes and the message of the
+            result from the data of a pair, raises an error when the pair
+            can not be processed
+        force(bool): disconnect other sources of the destinations
+        use_modifier(bool): use a modifier when the undo plug-in is
+            available
+
+    Returns:
+        list: result per pair, see `connect_many`
+
+    """
+
+    if use_modifier and apiundo.is_available():
+        queue = ConnectionModifier()
+    else:
+        queue = ConnectionCommands()
+
+    results = []
+    with undo_chunk():
+        for rig, match, data in items:
+            result = _new_result(rig, match)
+            results.append(result)
+
+            try:
+                changes, message = get_changes(data)
+                queue.queue(changes, force=force)
+            except Exception as exc:
+                log.error("Failed to process %s -> %s: %s"
+                          % (match["label"], rig["label"], exc))
+                result.update({"success": False, "message": str(exc)})
+                continue
+
+            result["message"] = message
+
+        try:
+            queue.doIt()
+        except Exception as exc:
+            log.error("Failed to apply the changes: %s" % exc)
+            for result in results:
+                if result["success"]:
+                    result.update({"success": False, "message": str(exc)})
+
+    return results
+
+
+def _get_plan_changes(action, rig_members_by_id, input_members_by_id,
+                      connections):
+    """Get the changes to connect or disconnect all inputs of the plan
+
+    Raises:
+        ValueError: not all nodes of the inputs could be found
+
+    """
+    plan = get_connection_plan(rig_members_by_id,
+                               input_members_by_id,
+                               connections)
+    plan.check()
+
+    return [(action, src, dest) for src, dest in plan.plugs]
+
+
+@profiling.timed("connect")
+def connect(rig_members_by_id, input_members_by_id, connections, force=True):
+    """Create a connection between source and input based on the meta data
+
+    Args:
+        rig_members_by_id(dict):  source data from the source item
+        input_members_by_id(dict): input data from the input item
+        connections(dict): metadata from the meta data file
+
+        force(bool): Force connections between nodes, default is True
+
+    Raises:
+        ValueError: not all nodes of the inputs could be found, nothing
+            is connected
+
+    Returns:
+        None
+
+    """
+    changes = _get_plan_changes("connect",
+                                rig_members_by_id,
+                                input_members_by_id,
+                                connections)
+    ConnectionCommands().queue(changes, force=force)
+
+
+@profiling.timed("disconnect")
+def disconnect(rig_members_by_id, input_members_by_id, connections):
+    """Break all connections between source and input nodes
+
+    Args:
+        rig_members_by_id(dict):  node hash based on cbId
+        input_members_by_id(dict): node hash based on cbId
+        connections(dict): metadata from the meta data file
+
+    Raises:
+        ValueError: not all nodes of the inputs could be found, nothing
+            is disconnected
+
+    Returns:
+        None
+
+    """
+    changes = _get_plan_changes("disconnect",
+                                rig_members_by_id,
+                                input_members_by_id,
+                                connections)
+    ConnectionCommands().queue(changes)
+
+
+def _change_pairs(action, pairs, metadata=None, force=True,
+                  use_modifier=True):
+    """Connect or disconnect all inputs of each rig and match pair"""
+
+    metadata = _fetch_rig_metadata([rig for rig, match in pairs], metadata)
+
+    def get_changes(pair):
+        rig, match = pair
+        connections = metadata[str(rig["representation"])]
+        changes = _get_plan_changes(action,
+                                    rig["nodes"],
+                                    match["nodes"],
+                                    connections)
+        return changes, ""
+
+    return _apply_changes([(rig, match, (rig, match)) for rig, match
+                           in pairs],
+                          get_changes,
+                          force=force,
+                          use_modifier=use_modifier)
+
+
+@profiling.timed("connect")
+def connect_many(pairs, force=True, use_modifier=True, metadata=None):
+    """Connect multiple rig and match pairs as a single undoable action
+
+    A failing pair does not stop the other pairs from being connected.
+
+    Args:
+        pairs(list): rig and match node pairs
+        force(bool): Force connections between nodes, default is True
+        use_modifier(bool): make all connections with a single modifier
+            when the undo plug-in is available, see `ConnectionModifier`
+        metadata (dict, optional): metadata per representation ID, when
+            not given it will be fetched for all rigs at once
+
+    Returns:
+        list: result per pair, each result is a dict with the "rig" and
+            "match" labels, "success" and an error "message"
+
+    """
+    return _change_pairs("connect", pairs,
+                         metadata=metadata,
+                         force=force,
+                         use_modifier=use_modifier)
+
+
+@profiling.timed("disconnect")
+def disconnect_many(pairs, use_modifier=True, metadata=None):
+    """Disconnect multiple rig and match pairs as a single undoable action
+
+    Args:
+        pairs(list): rig and match node pairs
+        use_modifier(bool): break all connections with a single modifier
+            when the undo plug-in is available, see `ConnectionModifier`
+        metadata (dict, optional): metadata per representation ID, when
+            not given it will be fetched for all rigs at once
+
+    Returns:
+        list: result per pair, see `connect_many`
+
+    """
+    return _change_pairs("disconnect", pairs,
+                         metadata=metadata,
+                         use_modifier=use_modifier)
@@ -4,13 +4,41 @@ from avalon.vendor.Qt import QtCore, QtWidgets, QtGui
 from avalon.vendor import qtawesome
 from avalon.style import colors
 
+from .search import PrefixIndex
+
 CONNECTED_ROLE = QtCore.Qt.UserRole + 2
 
+HIGHLIGHT_COLOR = "#5aa6d6"
+
 
 class AssetModel(model.TreeModel):
 
     COLUMNS = ["label"]
 
+    # Icons and brushes are shared by all models, created on first use
+    _icons = {}
+    _brushes = {}
+
+    def __init__(self, parent=None):
+        model.TreeModel.__init__(self, parent=parent)
+
+        self._rows_by_name = {}
+        self._rows_by_label = {}
+        self._prefix_index = None
+        self._highlighted = set()
+
+    def _sort_items(self, items):
+        """Get the items in the order they are shown in the model"""
+
+        # Add the items sorted by label
+        sorter = lambda x: x["label"]
+        return sorted(items, key=sorter)
+
+    def _create_node(self, item):
+        asset_item = model.Node(data={"icon": "scissors"})
+        asset_item.update(item)
+        return asset_item
+
     def add_items(self, items):
         """
         Add items to model with needed data
@@ -21,19 +49,197 @@ class AssetModel(model.TreeModel):
             None
         """
 
-        self.beginResetModel()
+        items = self._sort_items(items)
+        if not items:
+            return
 
-        # Add the items sorted by label
-        sorter = lambda x: x["label"]
+        first = self.rowCount(QtCore.QModelIndex())
+        last = first + len(items) - 1
+
+        self.beginInsertRows(QtCore.QModelIndex(), first, last)
+        for item in items:
+            self.add_child(self._create_node(item))
+        self.endInsertRows()
+
+        self._update_index()
+
+    def update_items(self, items):
+        """Update the model to the given items without resetting it
+
+        Rows of items which are no longer present are removed, existing rows
+        are updated in place and moved when their position changed, e.g. by
+        a new label, and new items are inserted. The selection and scroll
+        position of the views are kept.
+
+        Args:
+            items(list): collection of item data
+
+        Returns:
+            None
+        """
+
+        items = self._sort_items(items)
+        names = set(item["objectName"] for item in items)
+
+        parent = QtCore.QModelIndex()
+        root = self._root_node
+        children = root.children()
+
+        # Remove rows of items which are gone
+        for row in reversed(range(len(children))):
+            if children[row]["objectName"] in names:
+                continue
+
+            self.beginRemoveRows(parent, row, row)
+            children.pop(row)
+            self.endRemoveRows()
+
+        existing = {node["objectName"]: node for node in children}
+
+        changed = []
+        row = 0
+        for item in items:
+            node = existing.get(item["objectName"])
+            if node is not None:
+                if self._is_changed(node, item):
+                    node.update(item)
+                    changed.append(item["objectName"])
+
+                # The rows before this row are in place, move the row up
+                # when another row is in its position
+                if children[row] is not node:
+                    source = children.index(node, row)
+                    self.beginMoveRows(parent, source, source, parent, row)
+                    children.insert(row, children.pop(source))
+                    self.endMoveRows()
+
+                row += 1
+                continue
+
+            # Insert the new item at its position
+            self.beginInsertRows(parent, row, row)
+            self.add_child(self._create_node(item))
+            children.insert(row, children.pop())
+            self.endInsertRows()
+
+            row += 1
+
+        self._update_index()
+
+        # Refresh the data of the changed rows, one range per block of
+        # adjacent rows
+        rows = sorted(self._rows_by_name[name] for name in changed)
+        for first, last in self._get_ranges(rows):
+            self.dataChanged.emit(self.index(first, 0, parent),
+                                  self.index(last, 0, parent))
+
+    @staticmethod
+    def _is_changed(node, item):
+        """Check whether the item holds other data than the node"""
+        missing = object()
+        for key, value in item.items():
+            current = node.get(key, missing)
+            # Unchanged containers keep their objects, skip comparing them
+            if current is not value and current != value:
+                return True
+        return False
+
+    @staticmethod
+    def _get_ranges(rows):
+        """Get the first and last row of each block of adjacent rows"""
+        ranges = []
+        for row in rows:
+            if ranges and ranges[-1][1] == row - 1:
+                ranges[-1][1] = row
+            else:
+                ranges.append([row, row])
+        return ranges
+
+    def clear(self):
+        super(AssetModel, self).clear()
+        self._update_index()
+
+    def _update_index(self):
+        """Rebuild the lookups of the rows after the rows have changed"""
+
+        self._rows_by_name = {}
+        self._rows_by_label = {}
+        for row, node in enumerate(self._root_node.children()):
+            self._rows_by_name[node["objectName"]] = row
+            self._rows_by_label.setdefault(node["label"], row)
+
+        self._highlighted &= set(self._rows_by_name)
+
+        # Built on the first search
+        self._prefix_index = None
+
+    def find_index(self, label):
+        """Get the index of the first row with the label
+
+        Args:
+            label(str): label of the item
 
-        for item in sorted(items, key=sorter):
+        Returns:
+            QtCore.QModelIndex or None
+        """
+
+        row = self._rows_by_label.get(label)
+        if row is None:
+            return None
+        return self.index(row, 0, QtCore.QModelIndex())
+
+    def find_index_by_name(self, object_name):
+        """Get the index of the row of the container
+
+        Args:
+            object_name(str): object name of the container
+
+        Returns:
+            QtCore.QModelIndex or None
+        """
 
-            asset_item = model.Node(data={"icon": "scissors"})
-            asset_item.update(item)
+        row = self._rows_by_name.get(object_name)
+        if row is None:
+            return None
+        return self.index(row, 0, QtCore.QModelIndex())
 
-            self.add_child(asset_item)
+    def find_rows(self, text):
+        """Get the rows with a word in the label starting with the text
 
-        self.endResetModel()
+        Args:
+            text(str): words separated by white space
+
+        Returns:
+            set: row numbers
+        """
+
+        if self._prefix_index is None:
+            labels = [node["label"] for node in self._root_node.children()]
+            self._prefix_index = PrefixIndex(labels)
+
+        return self._prefix_index.find(text)
+
+    def set_highlighted(self, object_names):
+        """Highlight the rows of the containers, e.g. the compatible items
+
+        Only the rows of which the state changes are updated.
+
+        Args:
+            object_names(iterable): object names of the containers
+
+        Returns:
+            None
+        """
+
+        highlighted = set(name for name in object_names
+                          if name in self._rows_by_name)
+        changed = highlighted ^ self._highlighted
+        self._highlighted = highlighted
+
+        parent = QtCore.QModelIndex()
+        for object_name in changed:
+            index = self.index(self._rows_by_name[object_name], 0, parent)
+            self.dataChanged.emit(index, index)
 
     def data(self, index, role):
 
@@ -50,11 +256,38 @@ class AssetModel(model.TreeModel):
                 node = index.internalPointer()
                 icon = node.get("icon")
                 if icon:
-                    return qtawesome.icon("fa.{0}".format(icon),
-                                          color=colors.default)
+                    return self.get_icon(icon)
+
+        if role == QtCore.Qt.ForegroundRole:
+            node = index.internalPointer()
+            if node["objectName"] in self._highlighted:
+                return self.get_brush(HIGHLIGHT_COLOR)
 
         return super(AssetModel, self).data(index, role)
 
+    @classmethod
+    def get_icon(cls, name):
+        """Get the cached icon by its font awesome name"""
+
+        icon = cls._icons.get(name)
+        if icon is None:
+            icon = qtawesome.icon("fa.{0}".format(name),
+                                  color=colors.default)
+            cls._icons[name] = icon
+
+        return icon
+
+    @classmethod
+    def get_brush(cls, color):
+        """Get the cached brush of the color"""
+
+        brush = cls._brushes.get(color)
+        if brush is None:
+            brush = QtGui.QBrush(QtGui.QColor(color))
+            cls._brushes[color] = brush
+
+        return brush
+
     def get_indexes(self):
         indexes = []
         row_count = self.rowCount(QtCore.QModelIndex())
@@ -70,53 +303,222 @@ class MatchModel(AssetModel):
 
     COLUMNS = ["label"]
 
+    # Emitted when the lookups are rebuilt after the rows have changed
+    indexed = QtCore.Signal()
+
+    # Fonts are shared by all models, created on first use
+    _fonts = {}
+
     def __init__(self, parent=None):
         AssetModel.__init__(self, parent=parent)
-        self._linked_index = None
+        self._names_by_rig = {}
+        self._connected = {}
+        self._linked_rigs = set()
+        self._linked = set()
 
-    def set_linked_index(self, index):
-        self._linked_index = index
+    def _sort_items(self, items):
+        return list(items)
 
-    def add_items(self, items):
-        """Add items to model with needed data
+    def _create_node(self, item):
+        node = model.Node(data={"icon": "cube"})
+        node.update(item)
+        return node
+
+    def _update_index(self):
+        super(MatchModel, self)._update_index()
+
+        self._names_by_rig = {}
+        for node in self._root_node.children():
+            for rig_name in node.get("rigs", []):
+                self._names_by_rig.setdefault(rig_name, set()).add(
+                    node["objectName"])
+
+        self._linked &= set(self._rows_by_name)
+
+        self.indexed.emit()
 
-        An item exists of:
-            {
-                "subset": 'name of subset',
-                "asset": asset_document
-            }
+    def get_compatible(self, rig_name):
+        """Get the object names of the matches which can feed the rig
 
         Args:
-            items(list): collection of item data
+            rig_name(str): object name of the rig container
+
+        Returns:
+            set
+        """
+
+        return self._names_by_rig.get(rig_name, set())
+
+    def set_linked_rigs(self, rig_names):
+        """Mark the matches which are connected to the rigs
+
+        Args:
+            rig_names(iterable): object names of the selected rigs
 
         Returns:
             None
         """
 
-        self.beginResetModel()
+        self._linked_rigs = set(rig_names)
+        self._update_linked()
 
-        for item in items:
+    def set_connected(self, connected):
+        """Store which matches each rig is connected to
 
-            node = model.Node(data={"icon": "cube"})
-            node.update(item)
+        Args:
+            connected(dict): object names of the connected matches per rig
+                object name
 
-            self.add_child(node)
+        Returns:
+            None
+        """
 
-        self.endResetModel()
+        self._connected = {rig_name: set(match_names)
+                           for rig_name, match_names in connected.items()}
+        self._update_linked()
+
+    def update_connected(self, connected, object_names):
+        """Replace the connection state of the pairs which were queried again
+
+        Args:
+            connected(dict): object names of the connected matches per rig
+                object name, of the pairs with a rig or match in
+                object_names
+            object_names(iterable): the rigs and matches of which all pairs
+                were queried again, also the removed ones
+
+        Returns:
+            None
+        """
+
+        object_names = set(object_names)
+
+        merged = {}
+        for rig_name, match_names in self._connected.items():
+            if rig_name not in object_names:
+                merged[rig_name] = match_names - object_names
+
+        for rig_name, match_names in connected.items():
+            merged.setdefault(rig_name, set()).update(match_names)
+
+        self._connected = merged
+        self._update_linked()
+
+    def _update_linked(self):
+        """Update the rows of which the linked state has changed"""
+
+        linked = set()
+        for rig_name in self._linked_rigs:
+            linked.update(self._connected.get(rig_name, ()))
+
+        changed = linked ^ self._linked
+        self._linked = linked
+
+        parent = QtCore.QModelIndex()
+        for object_name in changed:
+            row = self._rows_by_name.get(object_name)
+            if row is None:
+                continue
+            index = self.index(row, 0, parent)
+            self.dataChanged.emit(index, index)
+
+    @classmethod
+    def get_font(cls, linked):
+        """Get the cached font for linked or regular items"""
+
+        font = cls._fonts.get(linked)
+        if font is None:
+            font = QtGui.QFont()
+            if linked:
+                font.setItalic(True)
+                font.setBold(True)
+            cls._fonts[linked] = font
+
+        return font
 
     def data(self, index, role):
 
         # Set the connected item in italics
         if role == QtCore.Qt.FontRole:
-            font = QtGui.QFont()
             node = index.internalPointer()
-            if not self._linked_index:
-                return font
-
-            is_connected = self._linked_index in node.get("linkedIndex", [])
-            if is_connected:
-                font.setItalic(True)
-                font.setBold(True)
-            return font
+            return self.get_font(node["objectName"] in self._linked)
 
         return super(MatchModel, self).data(index, role)
+
+
+class MatchProxyModel(QtCore.QSortFilterProxyModel):
+    """Show only the candidates of the selected rigs and the filter text
+
+    The accepted object names are computed once per change of the rigs,
+    the text or the rows of the source model, each row is then accepted
+    with a set lookup.
+
+    """
+
+    def __init__(self, parent=None):
+        super(MatchProxyModel, self).__init__(parent)
+        self._rig_names = set()
+        self._text = ""
+
+        # Accepted object names, None accepts all
+        self._accepted_by_rig = None
+        self._accepted_by_text = None
+
+    def setSourceModel(self, source_model):
+        super(MatchProxyModel, self).setSourceModel(source_model)
+        source_model.indexed.connect(self._update)
+
+    def set_rigs(self, rig_names):
+        """Only show the matches which can feed one of the rigs
+
+        Args:
+            rig_names(iterable): object names of the rigs, all matches are
+                shown when empty
+
+        Returns:
+            None
+        """
+
+        self._rig_names = set(rig_names)
+        self._update()
+
+    def set_filter_text(self, text):
+        """Only show the matches with a word starting with the text"""
+        self._text = text
+        self._update()
+
+    def _update(self):
+        source = self.sourceModel()
+
+        accepted_by_rig = None
+        if self._rig_names:
+            accepted_by_rig = set()
+            for rig_name in self._rig_names:
+                accepted_by_rig.update(source.get_compatible(rig_name))
+
+        accepted_by_text = None
+        if self._text.strip():
+            parent = QtCore.QModelIndex()
+            accepted_by_text = set()
+            for row in source.find_rows(self._text):
+                node = source.index(row, 0, parent).internalPointer()
+                accepted_by_text.add(node["objectName"])
+
+        self._accepted_by_rig = accepted_by_rig
+        self._accepted_by_text = accepted_by_text
+
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        index = self.sourceModel().index(source_row, 0, source_parent)
+        object_name = index.internalPointer()["objectName"]
+
+        if (self._accepted_by_rig is not None and
+                object_name not in self._accepted_by_rig):
+            return False
+
+        if (self._accepted_by_text is not None and
+                object_name not in self._accepted_by_text):
+            return False
+
+        return True
@@ -0,0 +1,55 @@
+"""Maya plug-in which makes OpenMaya modifiers undoable
+
+The modifier is handed over by `mayayetirigmanager.apiundo`, the command
+executes it and keeps it for undo and redo.
+
+"""
+from maya.api import OpenMaya as om
+
+
+def maya_useNewAPI():
+    """Use the Maya Python API 2.0"""
+    pass
+
+
+class ApplyCommand(om.MPxCommand):
+    """Execute the pending modifier as a single undoable command"""
+
+    name = "yetiRigManagerApply"
+
+    def __init__(self):
+        om.MPxCommand.__init__(self)
+        self._modifier = None
+
+    @staticmethod
+    def creator():
+        return ApplyCommand()
+
+    def doIt(self, args):
+        from mayayetirigmanager import apiundo
+
+        self._modifier = apiundo.take()
+        try:
+            self._modifier.doIt()
+        except Exception:
+            # Revert the changes which were made before the failure
+            self._modifier.undoIt()
+            raise
+
+    def undoIt(self):
+        self._modifier.undoIt()
+
+    def redoIt(self):
+        self._modifier.doIt()
+
+    def isUndoable(self):
+        return True
+
+
+def initializePlugin(plugin):
+    om.MFnPlugin(plugin, "Colorbleed", "1.0").registerCommand(
+        ApplyCommand.name, ApplyCommand.creator)
+
+
+def uninitializePlugin(plugin):
+    om.MFnPlugin(plugin).deregisterCommand(ApplyCommand.name)
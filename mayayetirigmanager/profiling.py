@@ -0,0 +1,279 @@
+"""Timing and call counting of the refresh, connect and disconnect actions
+
+Profiling is disabled by default, call `enable()` or set the
+YETI_RIG_MANAGER_PROFILE environment variable to turn it on. When the
+variable is set to a path ending with ".json" the operations are written to
+that file after each operation. When disabled the instrumented functions
+only check a single flag.
+
+Each operation records the wall time per stage and the amount of calls
+made to `maya.cmds`, the database and the Colorbleed library. Stages can
+overlap when an instrumented function calls another one. The results are
+logged and can be written to a JSON file with `dump()`.
+
+"""
+import os
+import json
+import time
+import logging
+import functools
+import threading
+from collections import defaultdict
+
+log = logging.getLogger(__name__)
+
+ENVIRONMENT_VARIABLE = "YETI_RIG_MANAGER_PROFILE"
+
+# Maximum amount of finished operations kept for `dump`
+HISTORY_SIZE = 100
+
+_state = {"enabled": False,
+          "current": None,
+          "patched": {},
+          "dump_path": None}
+
+_history = []
+_lock = threading.Lock()
+
+
+class Profile(object):
+    """Recorded timings and call counts of a single operation"""
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.start = time.time()
+        self.end = None
+        self.stages = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def duration(self):
+        end = self.end if self.end is not None else time.time()
+        return end - self.start
+
+    def summary(self):
+        stages = sorted(self.stages.items(), key=lambda x: -x[1])
+        stages = ", ".join("%s %.3fs" % stage for stage in stages)
+
+        calls = sum(count for name, count in self.calls.items()
+                    if name.startswith("cmds."))
+        queries = sum(count for name, count in self.calls.items()
+                      if name.startswith("io."))
+
+        return ("%s: %.3fs (%s) - %i cmds calls, %i database queries"
+                % (self.name, self.duration(), stages, calls, queries))
+
+    def to_dict(self):
+        return {"name": self.name,
+                "start": self.start,
+                "duration": self.duration(),
+                "stages": dict(self.stages),
+                "calls": dict(self.calls)}
+
+
+class _CallCounter(object):
+    """Module proxy which counts the calls made to its functions"""
+
+    def __init__(self, module, prefix):
+        self._module = module
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        attr = getattr(self._module, name)
+        if not callable(attr) or isinstance(attr, type):
+            return attr
+
+        key = "%s.%s" % (self._prefix, name)
+
+        def wrapper(*args, **kwargs):
+            count(key)
+            return attr(*args, **kwargs)
+
+        return wrapper
+
+
+def is_enabled():
+    return _state["enabled"]
+
+
+def enable(dump_path=None):
+    """Enable profiling and count the calls made by the library
+
+    Args:
+        dump_path(str, optional): write all operations to this JSON file
+            after each finished operation
+
+    Returns:
+        None
+
+    """
+
+    _state["dump_path"] = dump_path
+
+    if _state["enabled"]:
+        return
+
+    from . import lib
+
+    # Replace the modules used by the library with counting proxies
+    for attr, prefix in (("cmds", "cmds"), ("io", "io"), ("cb", "cb")):
+        module = getattr(lib, attr)
+        _state["patched"][attr] = module
+        setattr(lib, attr, _CallCounter(module, prefix))
+
+    _state["enabled"] = True
+
+
+def disable():
+    """Disable profiling and restore the modules of the library"""
+
+    if not _state["enabled"]:
+        return
+
+    from . import lib
+
+    for attr, module in _state["patched"].items():
+        setattr(lib, attr, module)
+    _state["patched"] = {}
+
+    _state["enabled"] = False
+    _state["current"] = None
+    _state["dump_path"] = None
+
+
+def enable_from_environment():
+    """Enable profiling when the environment variable is set"""
+
+    value = os.environ.get(ENVIRONMENT_VARIABLE)
+    if not value:
+        return
+
+    enable(dump_path=value if value.endswith(".json") else None)
+
+
+def begin(name):
+    """Start recording a new operation
+
+    An operation started while another one is recorded, e.g. a connect
+    during a refresh, is recorded separately. The calls are counted for the
+    other operation again once it has ended.
+
+    Args:
+        name(str): name of the operation, e.g. "refresh"
+
+    Returns:
+        Profile or None: None when profiling is disabled
+
+    """
+    if not _state["enabled"]:
+        return None
+
+    profile = Profile(name, parent=_state["current"])
+    _state["current"] = profile
+    return profile
+
+
+def end(profile=None):
+    """Stop recording the operation and log its summary
+
+    Args:
+        profile(Profile, optional): the operation to stop, by default the
+            current operation
+
+    Returns:
+        Profile or None
+
+    """
+    profile = profile or _state["current"]
+    if profile is None:
+        return None
+
+    profile.end = time.time()
+
+    if _state["current"] is profile:
+        # Continue with the operation this one was started in
+        parent = profile.parent
+        while parent is not None and parent.end is not None:
+            parent = parent.parent
+        _state["current"] = parent
+    profile.parent = None
+
+    with _lock:
+        _history.append(profile)
+        del _history[:-HISTORY_SIZE]
+
+    log.info(profile.summary())
+
+    if _state["dump_path"]:
+        dump(_state["dump_path"])
+
+    return profile
+
+
+def count(name, amount=1):
+    """Count a call for the current operation"""
+    profile = _state["current"]
+    if profile is not None:
+        profile.calls[name] += amount
+
+
+def add_time(name, duration):
+    """Add the duration to the stage of the current operation"""
+    profile = _state["current"]
+    if profile is not None:
+        profile.stages[name] += duration
+
+
+def timed(stage):
+    """Decorator which adds the run time of the function to a stage
+
+    Args:
+        stage(str): name of the stage
+
+    """
+
+    def decorator(func):
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _state["current"] is None:
+                return func(*args, **kwargs)
+
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add_time(stage, time.time() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def get_history():
+    """Get the finished operations, oldest first"""
+    with _lock:
+        return list(_history)
+
+
+def clear_history():
+    with _lock:
+        del _history[:]
+
+
+def dump(path):
+    """Write all finished operations to a JSON file
+
+    Args:
+        path(str): file path
+
+    Returns:
+        None
+
+    """
+    data = {"operations": [profile.to_dict() for profile in get_history()]}
+    with open(path, "w") as fp:
+        json.dump(data, fp, indent=4, sort_keys=True)
+
+    log.info("Written profile to: %s" % path)
+
@@ -0,0 +1,57 @@
+"""Search the labels of the outliners, independent of Qt"""
+import re
+import bisect
+
+
+class PrefixIndex(object):
+    """Find rows by the start of the words in their label
+
+    The words of all labels are kept sorted, so the rows of a prefix are
+    found with a binary search instead of comparing every label.
+
+    Args:
+        labels(list): label per row
+
+    """
+
+    def __init__(self, labels):
+        entries = sorted((word, row) for row, label in enumerate(labels)
+                         for word in self.get_words(label))
+
+        self._words = [word for word, row in entries]
+        self._rows = [row for word, row in entries]
+
+    @staticmethod
+    def get_words(label):
+        """Get the lower case label and each word in it"""
+
+        label = label.lower()
+        words = set(word for word in re.split(r"[\s:|_\-]+", label) if word)
+        words.add(label)
+
+        return words
+
+    def find(self, text):
+        """Get the rows with a word starting with each word of the text
+
+        Args:
+            text(str): words separated by white space
+
+        Returns:
+            set: row numbers
+        """
+
+        rows = None
+        for prefix in text.lower().split():
+            found = set()
+            start = bisect.bisect_left(self._words, prefix)
+            for position in range(start, len(self._words)):
+                if not self._words[position].startswith(prefix):
+                    break
+                found.add(self._rows[position])
+
+            rows = found if rows is None else rows & found
+            if not rows:
+                break
+
+        return rows or set()
@@ -0,0 +1,273 @@
+"""Compact index of the inputs of a .rigsettings file
+
+The library only uses the "inputs" of the rig metadata, but the full JSON
+file can contain large sections with e.g. groom guides. The index stores
+the inputs as a table of string indices next to the .rigsettings file so
+loading it does not depend on the size of the unused sections.
+
+Layout, little endian:
+    header: magic, version, mtime and size of the .rigsettings file,
+        amount of strings, byte size of the strings, amount of inputs
+    strings: utf-8 strings separated by a null byte
+    inputs: sourceID, destinationID, source and destination attribute as
+        4 unsigned ints per input, indices into the strings
+
+The index is written at publish time with `create`, or from the command
+line with `python -m mayayetirigmanager.sidecar <files>`. When it is
+missing, stale or can not be read the JSON file is used. Set the
+YETI_RIG_MANAGER_SIDECAR environment variable to "0" to always read the
+JSON file, or to "write" to also write missing and stale indices when a
+file is read. A directory which can not be written to is not tried again
+in the same session.
+
+"""
+import os
+import sys
+import json
+import mmap
+import struct
+import logging
+import argparse
+import tempfile
+
+log = logging.getLogger(__name__)
+
+ENVIRONMENT_VARIABLE = "YETI_RIG_MANAGER_SIDECAR"
+
+EXTENSION = ".rigindex"
+
+MAGIC = b"YRMI"
+VERSION = 1
+
+_header = struct.Struct("<4sHdqIII")
+
+# Directories in which an index could not be written
+_read_only = set()
+
+
+def is_enabled():
+    return os.environ.get(ENVIRONMENT_VARIABLE, "1") != "0"
+
+
+def is_write_enabled():
+    return os.environ.get(ENVIRONMENT_VARIABLE) == "write"
+
+
+def get_sidecar_path(path):
+    """Get the path of the index which belongs to the .rigsettings file"""
+    return os.path.splitext(path)[0] + EXTENSION
+
+
+def load(path, signature=None, write_index=None):
+    """Load the inputs of the .rigsettings file
+
+    The index is used when it is up to date, otherwise the JSON file is
+    read. The metadata has the same layout in both cases.
+
+    Args:
+        path(str): the .rigsettings file
+        signature(tuple, optional): modification time and size of the
+            file, read from the file when not given
+        write_index(bool, optional): write a new index when it is missing or
+            stale, defaults to `is_write_enabled`
+
+    Returns:
+        dict: metadata with the "inputs" of the rig
+
+    """
+
+    if signature is None:
+        stat = os.stat(path)
+        signature = (stat.st_mtime, stat.st_size)
+
+    if not is_enabled():
+        return _load_json(path)
+
+    sidecar_path = get_sidecar_path(path)
+    try:
+        metadata = read(sidecar_path, signature)
+    except (IOError, OSError, ValueError, struct.error) as exc:
+        log.debug("Could not read index %s: %s" % (sidecar_path, exc))
+        metadata = None
+
+    if metadata is not None:
+        return metadata
+
+    metadata = _load_json(path)
+
+    if write_index is None:
+        write_index = is_write_enabled()
+
+    directory = os.path.dirname(os.path.abspath(sidecar_path))
+    if write_index and directory not in _read_only:
+        try:
+            write(sidecar_path, metadata, signature)
+        except (IOError, OSError, ValueError) as exc:
+            # E.g. published files are read only
+            log.debug("Could not write index %s: %s" % (sidecar_path, exc))
+            _read_only.add(directory)
+
+    return metadata
+
+
+def create(path):
+    """Write the index of the .rigsettings file, e.g. when publishing it
+
+    Args:
+        path(str): the .rigsettings file
+
+    Returns:
+        str: path of the index
+
+    """
+
+    stat = os.stat(path)
+    sidecar_path = get_sidecar_path(path)
+    write(sidecar_path, _load_json(path), (stat.st_mtime, stat.st_size))
+
+    return sidecar_path
+
+
+def _load_json(path):
+    with open(path, "r") as fp:
+        data = json.load(fp)
+    return {"inputs": data.get("inputs", [])}
+
+
+def read(path, signature):
+    """Read the inputs from the index
+
+    Args:
+        path(str): the index file
+        signature(tuple): modification time and size of the .rigsettings
+            file the index has to be built from
+
+    Returns:
+        dict or None: None when the index is stale
+
+    """
+
+    with open(path, "rb") as fp:
+        buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        header = _header.unpack_from(buffer)
+        (magic, version, mtime, size,
+         string_count, string_size, input_count) = header
+
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Unsupported index file")
+
+        if (mtime, size) != signature:
+            return None
+
+        offset = _header.size
+        if offset + string_size > len(buffer):
+            raise ValueError("Truncated string table")
+
+        strings = buffer[offset:offset + string_size].decode("utf-8")
+        strings = strings.split(u"\0") if string_count else []
+        if len(strings) != string_count:
+            raise ValueError("Corrupt string table")
+
+        offset += string_size
+        indices = struct.unpack_from("<%iI" % (input_count * 4),
+                                     buffer, offset)
+    finally:
+        buffer.close()
+
+    if indices and max(indices) >= string_count:
+        raise ValueError("String index out of range")
+
+    inputs = []
+    for index in range(0, len(indices), 4):
+        source, destination, src_attr, dest_attr = indices[index:index + 4]
+        inputs.append({"sourceID": strings[source],
+                       "destinationID": strings[destination],
+                       "connections": [strings[src_attr],
+                                       strings[dest_attr]]})
+
+    return {"inputs": inputs}
+
+
+def write(path, metadata, signature):
+    """Write the inputs of the metadata to an index
+
+    Args:
+        path(str): the index file
+        metadata(dict): parsed .rigsettings file
+        signature(tuple): modification time and size of the .rigsettings
+            file
+
+    Returns:
+        None
+
+    """
+
+    strings = []
+    lookup = {}
+
+    def get_index(value):
+        index = lookup.get(value)
+        if index is None:
+            index = lookup[value] = len(strings)
+            strings.append(value)
+        return index
+
+    indices = []
+    for input in metadata.get("inputs", []):
+        connections = input["connections"]
+        if len(connections) != 2:
+            raise ValueError("Unsupported connection: %s" % connections)
+
+        indices.extend((get_index(input["sourceID"]),
+                        get_index(input["destinationID"]),
+                        get_index(connections[0]),
+                        get_index(connections[1])))
+
+    table = u"\0".join(strings).encode("utf-8")
+
+    data = [_header.pack(MAGIC, VERSION, signature[0], signature[1],
+                         len(strings), len(table), len(indices) // 4),
+            table,
+            struct.pack("<%iI" % len(indices), *indices)]
+
+    # Write next to the target and move it in place so other sessions
+    # never read a partially written index
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".",
+                                         suffix=EXTENSION)
+    try:
+        with os.fdopen(handle, "wb") as fp:
+            fp.write(b"".join(data))
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="mayayetirigmanager.sidecar",
+        description="Write the index of .rigsettings files")
+    parser.add_argument("files", nargs="+", help=".rigsettings files")
+
+    args = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.INFO)
+
+    failed = 0
+    for path in args.files:
+        try:
+            log.info("Written %s" % create(path))
+        except (IOError, OSError, ValueError) as exc:
+            log.error("Could not index %s: %s" % (path, exc))
+            failed += 1
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
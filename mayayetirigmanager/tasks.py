@@ -0,0 +1,107 @@
+import time
+import logging
+
+from avalon.vendor.Qt import QtCore
+
+from . import lib, profiling
+
+log = logging.getLogger(__name__)
+
+
+class MetadataThread(QtCore.QThread):
+    """Fetch the metadata of the rigs outside of the main thread
+
+    Only the database queries and file reads are done in this thread, it
+    does not touch the Maya scene.
+
+    """
+
+    fetched = QtCore.Signal(object)
+    failed = QtCore.Signal(str)
+
+    # Error message per representation of which the metadata is missing
+    incomplete = QtCore.Signal(object)
+
+    def __init__(self, representations, parent=None):
+        super(MetadataThread, self).__init__(parent)
+        self._representations = list(representations)
+
+    def run(self):
+        try:
+            metadata, errors = lib.prefetch_connections(self._representations)
+        except Exception as exc:
+            log.exception("Failed to fetch metadata")
+            self.failed.emit(str(exc))
+            return
+
+        if errors:
+            self.incomplete.emit(errors)
+        self.fetched.emit(metadata)
+
+
+class ChunkedTask(QtCore.QObject):
+    """Run a generator on the main thread in short time slices
+
+    Between the slices control is returned to the event loop so the
+    interface stays responsive. Each `next` call on the generator should
+    be a small amount of work.
+
+    The generator is released and the task is deleted once it has
+    finished, failed or was cancelled.
+
+    """
+
+    progressed = QtCore.Signal()
+    finished = QtCore.Signal()
+    failed = QtCore.Signal(str)
+
+    def __init__(self, generator, budget=0.05, parent=None):
+        super(ChunkedTask, self).__init__(parent)
+        self._generator = generator
+        self._budget = budget
+        self._cancelled = False
+
+    def start(self):
+        QtCore.QTimer.singleShot(0, self._step)
+
+    def cancel(self):
+        self._cancelled = True
+        self._release()
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def _release(self):
+        """Drop the generator and the state it holds, delete the task"""
+        if self._generator is None:
+            return
+
+        generator = self._generator
+        self._generator = None
+        generator.close()
+        self.deleteLater()
+
+    def _step(self):
+        if self._cancelled or self._generator is None:
+            return
+
+        start = time.time()
+        deadline = start + self._budget
+        try:
+            while time.time() < deadline:
+                next(self._generator)
+        except StopIteration:
+            profiling.add_time("scan", time.time() - start)
+            self._release()
+            self.finished.emit()
+            return
+        except Exception as exc:
+            log.exception("Task failed")
+            self._release()
+            self.failed.emit(str(exc))
+            return
+
+        profiling.add_time("scan", time.time() - start)
+
+        self.progressed.emit()
+        QtCore.QTimer.singleShot(0, self._step)
@@ -13,7 +13,7 @@ class View(QtWidgets.QTreeView):
         # view settings
         self.setAlternatingRowColors(False)
         self.setSortingEnabled(True)
-        self.setSelectionMode(self.SingleSelection)
+        self.setSelectionMode(self.ExtendedSelection)
         self.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
 
     def get_indices(self):
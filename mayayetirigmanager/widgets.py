@@ -13,6 +13,63 @@ NODEROLE = QtCore.Qt.UserRole + 1
 MODELINDEX = QtCore.QModelIndex()
 
 
+def create_filter_field(outliner):
+    """Create the type-to-filter field of the outliner"""
+
+    field = QtWidgets.QLineEdit()
+    field.setPlaceholderText("Filter...")
+    field.setClearButtonEnabled(True)
+    field.textChanged.connect(outliner.set_filter)
+
+    return field
+
+
+def filter_rows(view, text, hidden=None):
+    """Hide the rows of the view without a word starting with the text
+
+    Args:
+        view(QtWidgets.QTreeView): view of an AssetModel
+        text(str): words separated by white space
+        hidden(set, optional): the rows which are hidden at the moment,
+            only the rows of which the state changes are updated
+
+    Returns:
+        set: the hidden rows
+    """
+
+    model = view.model()
+    rows = set(range(model.rowCount(MODELINDEX)))
+
+    visible = model.find_rows(text) if text.strip() else rows
+    filtered = rows - visible
+
+    changed = rows if hidden is None else filtered ^ hidden
+    for row in changed:
+        view.setRowHidden(row, MODELINDEX, row in filtered)
+
+    return filtered
+
+
+def select_rows(view, indexes):
+    """Replace the selection of the view by the rows of the indexes
+
+    Args:
+        view(QtWidgets.QTreeView): the view
+        indexes(list): indexes of the model of the view
+
+    Returns:
+        None
+    """
+
+    selection = QtCore.QItemSelection()
+    for index in indexes:
+        selection.select(index, index)
+
+    flags = (QtCore.QItemSelectionModel.ClearAndSelect |
+             QtCore.QItemSelectionModel.Rows)
+    view.selectionModel().select(selection, flags)
+
+
 class AssetOutliner(QtWidgets.QWidget):
 
     refreshed = QtCore.Signal()
@@ -37,7 +94,10 @@ class AssetOutliner(QtWidgets.QWidget):
         view.setMinimumHeight(180)
         view.setIndentation(10)
 
+        filter_field = create_filter_field(self)
+
         layout.addWidget(title)
+        layout.addWidget(filter_field)
         layout.addWidget(view)
 
         selection_model = view.selectionModel()
@@ -45,12 +105,15 @@ class AssetOutliner(QtWidgets.QWidget):
 
         self.view = view
         self.model = model
+        self.filter_field = filter_field
         self._selection_model = selection_model
+        self._hidden_rows = set()
 
         self.setLayout(layout)
 
     def clear(self):
         self.model.clear()
+        self._hidden_rows = set()
 
         # fix looks remaining visible when no items present after "refresh"
         # todo: figure out why this workaround is needed.
@@ -68,8 +131,31 @@ class AssetOutliner(QtWidgets.QWidget):
         """Add new items to the outliner"""
 
         self.model.add_items(items)
+        self._update_filter()
         self.refreshed.emit()
 
+    def set_items(self, items):
+        """Replace all items, unchanged rows and the selection are kept
+
+        Args:
+            items(list): collection of item data
+
+        Returns:
+            None
+
+        """
+
+        self.model.update_items(items)
+        self._update_filter()
+
+    def set_filter(self, text):
+        """Only show the items with a word starting with the text"""
+        self._hidden_rows = filter_rows(self.view, text, self._hidden_rows)
+
+    def _update_filter(self):
+        """Apply the filter to all rows after the rows have changed"""
+        self._hidden_rows = filter_rows(self.view, self.filter_field.text())
+
     def get_selection_model(self):
         return self.view.selectionModel()
 
@@ -85,6 +171,15 @@ class AssetOutliner(QtWidgets.QWidget):
 
         return items
 
+    def get_all_items(self):
+        """Get all items in the view
+
+        Returns:
+            list: list of dictionaries
+        """
+
+        return [idx.data(NODEROLE) for idx in self.model.get_indexes()]
+
     def get_all_assets(self):
         """Add all items from the current scene"""
 
@@ -102,61 +197,36 @@ class AssetOutliner(QtWidgets.QWidget):
         raise NotImplementedError
 
     def get_nodes(self, selection=False):
-        """Find the nodes in the current scene per asset."""
-        raise NotImplementedError
+        """Find the nodes in the current scene per asset
 
-        items = self.get_selected_items()
+        Args:
+            selection(bool): only the selected items, default is False
 
-        # Collect all nodes by hash (optimization)
-        # if not selection:
-        #     nodes = cmds.ls(dag=True,  long=True)
-        # else:
-        #     nodes = commands.get_selected_nodes()
-        # id_nodes = commands.create_asset_id_hash(nodes)
-        #
-        # # Collect the asset item entries per asset
-        # # and collect the namespaces we'd like to apply
-        # assets = dict()
-        # asset_namespaces = defaultdict(set)
-        # for item in items:
-        #     asset_id = str(item["asset"]["_id"])
-        #     asset_name = item["asset"]["name"]
-        #     asset_namespaces[asset_name].add(item.get("namespace"))
-        #
-        #     if asset_name in assets:
-        #         continue
-        #
-        #     assets[asset_name] = item
-        #     assets[asset_name]["nodes"] = id_nodes.get(asset_id, [])
-        #
-        # # Filter nodes to namespace (if only namespaces were selected)
-        # for asset_name in assets:
-        #     namespaces = asset_namespaces[asset_name]
-        #
-        #     # When None is present there should be no filtering
-        #     if None in namespaces:
-        #         continue
-        #
-        #     # Else only namespaces are selected and *not* the top entry so
-        #     # we should filter to only those namespaces.
-        #     nodes = assets[asset_name]["nodes"]
-        #     nodes = [node for node in nodes if
-        #              commands.get_namespace_from_node(node) in namespaces]
-        #     assets[asset_name]["nodes"] = nodes
-        #
-        # return assets
+        Returns:
+            dict: long names of the member nodes per container
+        """
+
+        if selection:
+            items = self.get_selected_items()
+        else:
+            items = self.get_all_items()
+
+        return lib.get_container_members([item["objectName"]
+                                          for item in items])
 
     def select_asset_from_items(self):
         """Select nodes from listed asset"""
 
-        # items = self.get_nodes(selection=False)
-        # nodes = []
-        # for item in items.values():
-        #     nodes.extend(item["nodes"])
-        #
-        # commands.select(nodes)
+        items = self.get_selected_items()
+        lib.select_containers([item["objectName"] for item in items])
 
-        raise NotImplementedError
+    def select_items(self, object_names):
+        """Select the rows of the containers"""
+
+        indexes = [self.model.find_index_by_name(name)
+                   for name in object_names]
+        select_rows(self.view, [index for index in indexes
+                                if index is not None])
 
 
 class MatchOutliner(QtWidgets.QWidget):
@@ -176,15 +246,22 @@ class MatchOutliner(QtWidgets.QWidget):
         title.setAlignment(QtCore.Qt.AlignLeft)
         title.setStyleSheet("font-weight: bold; font-size: 12px")
 
+        # Only the candidates of the selected rigs are shown
         model = models.MatchModel()
+        proxy = models.MatchProxyModel()
+        proxy.setSourceModel(model)
+
         view = views.View()
-        view.setModel(model)
+        view.setModel(proxy)
         view.setSortingEnabled(False)
         view.setHeaderHidden(True)
         view.setMinimumHeight(180)
         view.setIndentation(10)
 
+        filter_field = create_filter_field(self)
+
         layout.addWidget(title)
+        layout.addWidget(filter_field)
         layout.addWidget(view)
 
         selection_model = view.selectionModel()
@@ -192,6 +269,8 @@ class MatchOutliner(QtWidgets.QWidget):
 
         self.view = view
         self.model = model
+        self.proxy = proxy
+        self.filter_field = filter_field
         self._selection_model = selection_model
 
     def clear(self):
@@ -200,13 +279,47 @@ class MatchOutliner(QtWidgets.QWidget):
     def add_items(self, items):
         self.model.add_items(items)
 
+    def set_items(self, items):
+        """Replace all items, unchanged rows and the selection are kept
+
+        Args:
+            items(list): collection of item data
+
+        Returns:
+            None
+
+        """
+
+        self.model.update_items(items)
+
+    def set_filter(self, text):
+        """Only show the items with a word starting with the text"""
+        self.proxy.set_filter_text(text)
+
+    def set_rigs(self, rig_names):
+        """Only show the candidates of the rigs and mark the connected ones
+
+        Args:
+            rig_names(iterable): object names of the selected rigs, all
+                matches are shown when empty
+
+        Returns:
+            None
+
+        """
+
+        rig_names = set(rig_names)
+        self.model.set_linked_rigs(rig_names)
+        self.proxy.set_rigs(rig_names)
+
     def clear_selection(self):
         flags = self._selection_model.Clear
         self._selection_model.select(QtCore.QModelIndex(), flags)
 
     def select_index(self, index, flags=None):
+        """Select the index of the source model"""
         flags = flags or self._selection_model.ClearAndSelect
-        self._selection_model.select(index, flags)
+        self._selection_model.select(self.proxy.mapFromSource(index), flags)
 
     def get_selected_items(self):
         """Get current selected items from view
@@ -219,3 +332,28 @@ class MatchOutliner(QtWidgets.QWidget):
         items = [d for d in datas if d is not None]  # filter Nones
 
         return items
+
+    def get_all_items(self):
+        """Get all items in the view
+
+        Returns:
+            list: list of dictionaries
+        """
+
+        return [idx.data(NODEROLE) for idx in self.model.get_indexes()]
+
+    def select_items(self, object_names):
+        """Select the rows of the containers which are shown"""
+
+        indexes = []
+        for object_name in object_names:
+            index = self.model.find_index_by_name(object_name)
+            if index is None:
+                continue
+
+            # Rows which are filtered out map to an invalid index
+            index = self.proxy.mapFromSource(index)
+            if index.isValid():
+                indexes.append(index)
+
+        select_rows(self.view, indexes)
@@ -0,0 +1,16 @@
+"""Run the tests outside of Maya with the fakes of the benchmarks"""
+import os
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (root, os.path.join(root, "benchmarks")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Never use the persistent cache of the user
+os.environ["YETI_RIG_MANAGER_CACHE"] = "0"
+
+import fakes  # noqa: E402
+
+# The library can only be imported once the fakes are installed
+fakes.install(None)
@@ -0,0 +1,96 @@
+from mayayetirigmanager import lib
+
+
+def create_rig(name, namespace, source_ids):
+    metadata = {"inputs": [{"sourceID": _id,
+                            "destinationID": "rig:%s" % _id,
+                            "connections": ["worldMesh", "inMesh"]}
+                           for _id in source_ids]}
+    rig = {"objectName": name,
+           "label": name,
+           "namespace": namespace,
+           "representation": "%s_representation" % name}
+    return rig, metadata
+
+
+def create_match(name, namespace, ids, rigs):
+    return {"objectName": name,
+            "label": name,
+            "namespace": namespace,
+            "nodes": dict((_id, ["|%s:%s" % (namespace, _id)])
+                          for _id in ids),
+            "rigs": list(rigs)}
+
+
+def get_assignment(rigs, matches):
+    rig_items = [rig for rig, metadata in rigs]
+    metadata = dict((rig["representation"], data) for rig, data in rigs)
+    plan = lib.get_assignment(rig_items, matches, metadata)
+    return dict((entry["rig"]["objectName"], entry["match"]["objectName"])
+                for entry in plan)
+
+
+def test_one_to_one():
+    rigs = [create_rig("rigA", "char_01_yeti", ["body"]),
+            create_rig("rigB", "char_02_yeti", ["body"])]
+    matches = [create_match("m1", "char_01", ["body"], ["rigA", "rigB"]),
+               create_match("m2", "char_02", ["body"], ["rigA", "rigB"])]
+
+    assert get_assignment(rigs, matches) == {"rigA": "m1", "rigB": "m2"}
+
+
+def test_augmenting_path():
+    # The best candidate of rigA is the only candidate of rigB, rigA has
+    # to move to its second candidate
+    rigs = [create_rig("rigA", "char_01_yeti", ["body"]),
+            create_rig("rigB", "other", ["body", "head"])]
+    matches = [create_match("m1", "char_01", ["body"], ["rigA", "rigB"]),
+               create_match("m2", "char_03", ["body"], ["rigA"])]
+
+    assert get_assignment(rigs, matches) == {"rigA": "m2", "rigB": "m1"}
+
+
+def test_coverage_before_affinity():
+    rigs = [create_rig("rigA", "char_01_yeti", ["body", "head"])]
+    matches = [create_match("partial", "char_01", ["body"], ["rigA"]),
+               create_match("full", "prop_07", ["body", "head"], ["rigA"])]
+
+    assert get_assignment(rigs, matches) == {"rigA": "full"}
+
+
+def test_affinity_breaks_ties():
+    rigs = [create_rig("rigA", "char_02_yeti", ["body"])]
+    matches = [create_match("m1", "char_01", ["body"], ["rigA"]),
+               create_match("m2", "char_02", ["body"], ["rigA"])]
+
+    assert get_assignment(rigs, matches) == {"rigA": "m2"}
+
+
+def test_more_rigs_than_matches():
+    rigs = [create_rig("rigA", "char_01_yeti", ["body"]),
+            create_rig("rigB", "char_02_yeti", ["body"])]
+    matches = [create_match("m1", "char_01", ["body"], ["rigA", "rigB"])]
+
+    assert get_assignment(rigs, matches) == {"rigA": "m1"}
+
+
+def test_rigs_without_inputs_or_candidates():
+    rigs = [create_rig("rigA", "char_01_yeti", []),
+            create_rig("rigB", "char_02_yeti", ["body"])]
+    matches = [create_match("m1", "char_01", ["body"], ["rigA"])]
+
+    assert get_assignment(rigs, matches) == {}
+
+
+def test_plan_scores():
+    rig, metadata = create_rig("rigA", "char_01_yeti", ["body", "head"])
+    match = create_match("m1", "char_01", ["body"], ["rigA"])
+
+    plan = lib.get_assignment([rig], [match],
+                              {rig["representation"]: metadata})
+
+    assert len(plan) == 1
+    assert plan[0]["rig"] is rig
+    assert plan[0]["match"] is match
+    assert plan[0]["coverage"] == 0.5
+    assert 0.5 < plan[0]["affinity"] <= 1.0
@@ -0,0 +1,64 @@
+import sys
+
+import pytest
+
+from mayayetirigmanager import batch, lib
+
+import fakes
+
+
+@pytest.fixture
+def scene(tmpdir, monkeypatch):
+    scene = fakes.Scene(2, 4, 2, 2, str(tmpdir))
+    fakes.install(scene)
+    lib.clear_cache()
+
+    saved = []
+
+    def file(*args, **kwargs):
+        if kwargs.get("save"):
+            saved.append(True)
+
+    monkeypatch.setattr(sys.modules["maya.cmds"], "file", file, raising=False)
+    scene.saved = saved
+
+    yield scene
+    lib.clear_cache()
+    fakes.install(None)
+
+
+def test_save_connected_scene(scene):
+    report = batch.process_scene("shot.ma")
+
+    assert report["success"]
+    assert report["saved"]
+    assert scene.saved
+    assert scene.connections
+
+
+def test_do_not_save_failed_scene(scene, monkeypatch):
+    apply_connection_diff = lib.apply_connection_diff
+
+    def fail(diffs, **kwargs):
+        results = apply_connection_diff(diffs, **kwargs)
+        results[0].update({"success": False, "message": "Failed"})
+        return results
+
+    monkeypatch.setattr(lib, "apply_connection_diff", fail)
+
+    report = batch.process_scene("shot.ma")
+
+    assert not report["success"]
+    assert not report["saved"]
+    assert not scene.saved
+
+
+def test_do_not_save_unchanged_scene(scene):
+    batch.process_scene("shot.ma")
+    del scene.saved[:]
+
+    report = batch.process_scene("shot.ma")
+
+    assert report["success"]
+    assert not report["saved"]
+    assert not scene.saved
@@ -0,0 +1,72 @@
+import time
+import threading
+import multiprocessing
+from collections import OrderedDict
+
+from mayayetirigmanager import lib
+
+
+def test_results_and_errors():
+    def divide(a, b):
+        return a / b
+
+    arguments = OrderedDict([("half", (1.0, 2.0)), ("error", (1.0, 0.0))])
+    results, errors = lib._run_concurrent(divide, arguments, workers=2)
+
+    assert results == {"half": 0.5}
+    assert list(errors) == ["error"]
+    assert isinstance(errors["error"], ZeroDivisionError)
+
+
+def test_no_arguments():
+    assert lib._run_concurrent(len, OrderedDict()) == ({}, {})
+
+
+def test_queued_calls_are_not_timed():
+    # Together the calls take longer than the timeout of a single call
+    arguments = OrderedDict((key, (0.05,)) for key in range(4))
+    results, errors = lib._run_concurrent(time.sleep, arguments,
+                                          workers=1, timeout=0.15)
+
+    assert sorted(results) == [0, 1, 2, 3]
+    assert not errors
+
+
+def test_timeout_skips_remaining_calls():
+    release = threading.Event()
+
+    def call(key):
+        if key == "slow":
+            release.wait(5.0)
+        return key
+
+    arguments = OrderedDict((key, (key,)) for key in ("slow", "a", "b"))
+    try:
+        results, errors = lib._run_concurrent(call, arguments,
+                                              workers=1, timeout=0.05)
+    finally:
+        release.set()
+
+    assert results == {}
+    assert sorted(errors) == ["a", "b", "slow"]
+    assert all(isinstance(error, multiprocessing.TimeoutError)
+               for error in errors.values())
+
+
+def test_timeout_keeps_other_threads():
+    release = threading.Event()
+
+    def call(key):
+        if key == "slow":
+            release.wait(5.0)
+        return key
+
+    arguments = OrderedDict((key, (key,)) for key in ("slow", "a", "b"))
+    try:
+        results, errors = lib._run_concurrent(call, arguments,
+                                              workers=2, timeout=0.05)
+    finally:
+        release.set()
+
+    assert results == {"a": "a", "b": "b"}
+    assert list(errors) == ["slow"]
@@ -0,0 +1,48 @@
+import pytest
+
+from mayayetirigmanager import lib
+
+import fakes
+
+
+@pytest.fixture
+def scene(tmpdir):
+    scene = fakes.Scene(1, 4, 1, 2, str(tmpdir))
+    fakes.install(scene)
+    lib.clear_cache()
+    yield scene
+    lib.clear_cache()
+    fakes.install(None)
+
+
+def get_rig(scene):
+    return next(container for container in scene.containers
+                if container["loader"] == "YetiRigLoader")
+
+
+def test_get_connections(scene):
+    rig = get_rig(scene)
+
+    metadata = lib.get_connections(rig["representation"])
+
+    assert len(metadata["inputs"]) == 2
+
+
+def test_get_connections_unreadable_file(scene):
+    rig = get_rig(scene)
+    representation = scene.representations[rig["representation"]]
+    path = lib.get_data_path(representation)
+    with open(path, "w") as f:
+        f.write("{not json")
+
+    with pytest.raises(RuntimeError) as info:
+        lib.get_connections(rig["representation"])
+
+    assert path in str(info.value)
+
+
+def test_get_connections_unknown_representation(scene):
+    with pytest.raises(RuntimeError) as info:
+        lib.get_connections("f" * 24)
+
+    assert "Could not find representation" in str(info.value)
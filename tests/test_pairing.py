@@ -0,0 +1,97 @@
+from mayayetirigmanager import lib
+
+INPUT = {"sourceID": "asset:body",
+         "destinationID": "rig:body",
+         "connections": ["worldMesh", "inMesh"]}
+
+SHARED = {"sourceID": "asset:ground",
+          "destinationID": "rig:ground",
+          "connections": ["worldMesh", "inMesh"]}
+
+
+def test_pair_on_relative_namespace():
+    pairs = lib.pair_namespaces(["crowd_yeti:hero", "crowd_yeti:extra"],
+                                ["crowd:extra", "crowd:hero"])
+
+    assert pairs == {"crowd_yeti:hero": "crowd:hero",
+                     "crowd_yeti:extra": "crowd:extra"}
+
+
+def test_pair_on_instance_number():
+    pairs = lib.pair_namespaces(["rig_01", "rig_02"],
+                                ["char_02", "char_01"])
+
+    assert pairs == {"rig_01": "char_01", "rig_02": "char_02"}
+
+
+def test_single_input_is_not_shared():
+    pairs = lib.pair_namespaces(["crowd_yeti:char_01", "crowd_yeti:char_02"],
+                                ["crowd:char_02"])
+
+    assert pairs == {"crowd_yeti:char_02": "crowd:char_02"}
+
+
+def test_leftovers_are_not_paired():
+    pairs = lib.pair_namespaces(["rig_01", "rig_03"], ["char_01", "char_02"])
+
+    assert pairs == {"rig_01": "char_01"}
+
+
+def test_ambiguous_number_is_not_paired():
+    # Both inputs have the instance number of the rig
+    assert lib.pair_namespaces(["rig_01"], ["charA_01", "charB_01"]) == {}
+
+    # Both rigs have the instance number of the input
+    assert lib.pair_namespaces(["a:rig_01", "b:rig_01"], ["char_01"]) == {}
+
+
+def test_no_namespaces():
+    assert lib.pair_namespaces([], ["char_01"]) == {}
+    assert lib.pair_namespaces(["rig_01"], []) == {}
+
+
+def test_plan_single_instance():
+    plan = lib.ConnectionPlan({"rig:body": ["|rig:grp|rig:bodyShape"]},
+                              {"asset:body": ["|char:grp|char:body"]},
+                              {"inputs": [INPUT]})
+
+    assert plan.plugs == (("|char:grp|char:body.worldMesh",
+                           "|rig:grp|rig:bodyShape.inMesh"),)
+    assert plan.missing == ()
+
+
+def test_plan_pairs_instances():
+    rig_nodes = {"rig:body": ["|rig_01:bodyShape", "|rig_02:bodyShape"]}
+    input_nodes = {"asset:body": ["|char_02:body", "|char_01:body"]}
+    plan = lib.ConnectionPlan(rig_nodes, input_nodes, {"inputs": [INPUT]})
+
+    assert sorted(plan.plugs) == [
+        ("|char_01:body.worldMesh", "|rig_01:bodyShape.inMesh"),
+        ("|char_02:body.worldMesh", "|rig_02:bodyShape.inMesh")]
+    assert plan.missing == ()
+
+
+def test_plan_unpaired_instance_is_missing():
+    rig_nodes = {"rig:body": ["|rig_01:bodyShape", "|rig_02:bodyShape"]}
+    input_nodes = {"asset:body": ["|char_02:body"]}
+    plan = lib.ConnectionPlan(rig_nodes, input_nodes, {"inputs": [INPUT]})
+
+    assert plan.plugs == (("|char_02:body.worldMesh",
+                           "|rig_02:bodyShape.inMesh"),)
+    assert plan.missing == (INPUT,)
+
+
+def test_plan_shared_source():
+    # The ground is not in the namespace of an instance
+    rig_nodes = {"rig:body": ["|rig_01:bodyShape", "|rig_02:bodyShape"],
+                 "rig:ground": ["|rig_01:groundShape", "|rig_02:groundShape"]}
+    input_nodes = {"asset:body": ["|char_01:body", "|char_02:body"],
+                   "asset:ground": ["|set:ground"]}
+    plan = lib.ConnectionPlan(rig_nodes, input_nodes,
+                              {"inputs": [INPUT, SHARED]})
+
+    assert ("|set:ground.worldMesh",
+            "|rig_01:groundShape.inMesh") in plan.plugs
+    assert ("|set:ground.worldMesh",
+            "|rig_02:groundShape.inMesh") in plan.plugs
+    assert plan.missing == ()
@@ -0,0 +1,32 @@
+from mayayetirigmanager.search import PrefixIndex
+
+LABELS = ["char_01_ - Hero", "char_02_ - Extra", "prop_01_ - Sword"]
+
+
+def test_find_word_prefix():
+    index = PrefixIndex(LABELS)
+
+    assert index.find("her") == {0}
+    assert index.find("char") == {0, 1}
+    assert index.find("01") == {0, 2}
+
+
+def test_find_all_words():
+    index = PrefixIndex(LABELS)
+
+    assert index.find("char 01") == {0}
+    assert index.find("CHAR sword") == set()
+
+
+def test_find_label_prefix():
+    index = PrefixIndex(LABELS)
+
+    assert index.find("char_02") == {1}
+    assert index.find("char_0 ex") == {1}
+
+
+def test_find_nothing():
+    index = PrefixIndex(LABELS)
+
+    assert index.find("missing") == set()
+    assert index.find("") == set()
@@ -0,0 +1,169 @@
+import os
+import json
+import struct
+
+import pytest
+
+from mayayetirigmanager import sidecar
+
+INPUTS = [{"sourceID": "asset:0001",
+           "destinationID": "rig:0001",
+           "connections": ["worldMesh", "inMesh"]},
+          {"sourceID": "asset:0002",
+           "destinationID": "rig:0002",
+           "connections": ["worldMesh", "inMesh"]}]
+
+
+@pytest.fixture
+def rigsettings(tmpdir):
+    path = str(tmpdir.join("rig.rigsettings"))
+    with open(path, "w") as f:
+        json.dump({"inputs": INPUTS, "guides": list(range(100))}, f)
+    return path
+
+
+def get_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime, stat.st_size
+
+
+def test_write_and_read(tmpdir):
+    path = str(tmpdir.join("rig.rigindex"))
+    sidecar.write(path, {"inputs": INPUTS}, (1.5, 100))
+
+    assert sidecar.read(path, (1.5, 100)) == {"inputs": INPUTS}
+
+
+def test_read_unicode(tmpdir):
+    path = str(tmpdir.join("rig.rigindex"))
+    inputs = [{"sourceID": u"asset:é",
+               "destinationID": u"rig:é",
+               "connections": [u"worldMesh", u"inMesh"]}]
+    sidecar.write(path, {"inputs": inputs}, (1.5, 100))
+
+    assert sidecar.read(path, (1.5, 100)) == {"inputs": inputs}
+
+
+def test_stale_index(tmpdir):
+    path = str(tmpdir.join("rig.rigindex"))
+    sidecar.write(path, {"inputs": INPUTS}, (1.5, 100))
+
+    assert sidecar.read(path, (2.5, 100)) is None
+    assert sidecar.read(path, (1.5, 101)) is None
+
+
+def test_read_bad_magic(tmpdir):
+    path = str(tmpdir.join("rig.rigindex"))
+    sidecar.write(path, {"inputs": INPUTS}, (1.5, 100))
+
+    with open(path, "r+b") as f:
+        f.write(b"JUNK")
+
+    with pytest.raises(ValueError):
+        sidecar.read(path, (1.5, 100))
+
+
+def test_read_junk(tmpdir):
+    path = str(tmpdir.join("rig.rigindex"))
+    with open(path, "wb") as f:
+        f.write(b"not an index at all, but long enough for a header")
+
+    with pytest.raises(ValueError):
+        sidecar.read(path, (1.5, 100))
+
+
+def test_read_truncated(tmpdir):
+    path = str(tmpdir.join("rig.rigindex"))
+    sidecar.write(path, {"inputs": INPUTS}, (1.5, 100))
+
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:sidecar._header.size + 4])
+
+    with pytest.raises(ValueError):
+        sidecar.read(path, (1.5, 100))
+
+
+def test_read_index_out_of_range(tmpdir):
+    path = str(tmpdir.join("rig.rigindex"))
+    sidecar.write(path, {"inputs": INPUTS}, (1.5, 100))
+
+    # Point the destination of the last input past the string table
+    with open(path, "r+b") as f:
+        f.seek(-8, os.SEEK_END)
+        f.write(struct.pack("<I", 1000))
+
+    with pytest.raises(ValueError):
+        sidecar.read(path, (1.5, 100))
+
+
+def test_load_corrupt_index(rigsettings):
+    sidecar.create(rigsettings)
+
+    with open(sidecar.get_sidecar_path(rigsettings), "r+b") as f:
+        f.seek(-4, os.SEEK_END)
+        f.write(struct.pack("<I", 1000))
+
+    assert sidecar.load(rigsettings) == {"inputs": INPUTS}
+
+
+def test_write_unsupported_connection(tmpdir):
+    path = str(tmpdir.join("rig.rigindex"))
+    inputs = [dict(INPUTS[0], connections=["worldMesh"])]
+
+    with pytest.raises(ValueError):
+        sidecar.write(path, {"inputs": inputs}, (1.5, 100))
+    assert not os.listdir(str(tmpdir))
+
+
+def test_load_does_not_write_by_default(rigsettings):
+    assert sidecar.load(rigsettings) == {"inputs": INPUTS}
+    assert not os.path.exists(sidecar.get_sidecar_path(rigsettings))
+
+
+def test_load_same_layout(rigsettings):
+    from_json = sidecar.load(rigsettings, write_index=True)
+    assert os.path.exists(sidecar.get_sidecar_path(rigsettings))
+
+    from_index = sidecar.load(rigsettings)
+    assert from_json == from_index == {"inputs": INPUTS}
+
+
+def test_load_stale_index(rigsettings):
+    sidecar.create(rigsettings)
+
+    inputs = INPUTS[:1]
+    with open(rigsettings, "w") as f:
+        json.dump({"inputs": inputs}, f)
+
+    assert sidecar.load(rigsettings) == {"inputs": inputs}
+
+
+def test_load_disabled(rigsettings, monkeypatch):
+    sidecar.create(rigsettings)
+    monkeypatch.setenv(sidecar.ENVIRONMENT_VARIABLE, "0")
+
+    def read(*args):
+        raise AssertionError("The index should not be read")
+
+    monkeypatch.setattr(sidecar, "read", read)
+
+    assert sidecar.load(rigsettings) == {"inputs": INPUTS}
+
+
+def test_load_read_only_directory(rigsettings, monkeypatch):
+    calls = []
+
+    def write(*args):
+        calls.append(args)
+        raise OSError("Read-only file system")
+
+    monkeypatch.setattr(sidecar, "write", write)
+    monkeypatch.setattr(sidecar, "_read_only", set())
+
+    for _ in range(2):
+        assert sidecar.load(rigsettings, write_index=True) == \
+            {"inputs": INPUTS}
+
+    assert len(calls) == 1